@@ -1,5 +1,9 @@
-from langchain_core.output_parsers import JsonOutputParser
+import logging
+from app.config import Config
 from langchain_google_genai import ChatGoogleGenerativeAI
+from .schemas import REPAIR_NONE, REPAIR_TRUNCATED, OutputValidationError, output_stats, repair_json
+
+logger = logging.getLogger(__name__)
 
 llm = ChatGoogleGenerativeAI(
     model="gemini-2.0-flash",
@@ -9,8 +13,58 @@ llm = ChatGoogleGenerativeAI(
     max_retries=1,
 )
 
-parser = JsonOutputParser()
 
-structured_output_llm = llm | parser
+def _message_text(message) -> str:
+    """Extract the text of a chat model response"""
+    content = message.content
+    if isinstance(content, list):
+        return "".join(
+            part if isinstance(part, str) else part.get("text", "")
+            for part in content
+        )
+    return content
+
+
+def invoke_structured(messages, validate, max_recalls: int = None):
+    """
+    Invoke the LLM and return output validated against a schema.
+
+    Output is repaired locally first (truncated JSON, loose types, bad
+    positions); the model is only called again when repair fails or
+    truncated output leaves an empty result.
+
+    Args:
+        messages: Chat messages to send
+        validate: Callable turning parsed JSON into the typed output,
+                  raising OutputValidationError when unrecoverable
+        max_recalls: Extra LLM calls allowed for unrecoverable output
+
+    Returns:
+        Validated output
+    """
+    if max_recalls is None:
+        max_recalls = Config.LLM_MAX_RECALLS
+
+    for attempt in range(max_recalls + 1):
+        output_stats.increment("calls")
+        if attempt:
+            output_stats.increment("recalls")
+        text = _message_text(llm.invoke(messages))
+        try:
+            data, repair = repair_json(text)
+            result = validate(data)
+            if repair == REPAIR_TRUNCATED and not result:
+                # Truncated output repaired down to nothing, e.g. '{"errors": ['
+                raise OutputValidationError("Truncated output is empty")
+        except OutputValidationError as e:
+            logger.warning(f"Unrecoverable LLM output (attempt {attempt + 1}): {str(e)}")
+            continue
+        # Unwrapping a code fence or prose is normal model behaviour, not a repair
+        output_stats.increment("clean" if repair == REPAIR_NONE else "repaired")
+        return result
+
+    output_stats.increment("failed")
+    raise OutputValidationError("LLM returned unrecoverable output")
+
 
-print("Initilized LLM successfully!")
\ No newline at end of file
+print("Initilized LLM successfully!")
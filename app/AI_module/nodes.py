@@ -1,30 +1,16 @@
+import json
 from langchain_core.messages import HumanMessage, SystemMessage
-from .llm import structured_output_llm
+from .llm import invoke_structured
+from .prompts import RETRY_ANALYSIS_PROMPT, SPEAKING_REPORT_PROMPT, build_retry_words
+from .schemas import coerce_errors, coerce_measures, coerce_report, merge_errors
 from .state import State
+from app.utils.profiling import profile_section
 
+@profile_section("analyze_pronunciation_errors_node")
 def analyze_pronunciation_errors_node(state: State) -> State:
-    reference_text = state['reference_text']
-    system_message = """
-You are an English pronunciation assistant. Based on text passage (reference_text)
-and an audio recording of them reading the text (user_input), analyze the audio based on the text.
-Identify any words in the reference_text that are mispronounced or omitted.
-For example, if the user provides the sentence 'I have a dog,' determine whether there are pronunciation errors for the words 'I,' 'have,' 'a,' or 'dog' based on the given audio.\n
-Output: The required output is a JSON containing error details in the following format:
-{
-  "errors": [
-    {
-      "word": "",                  // The mispronounced or omitted word.
-      "position": 0,               // The position (index) of the word in the sentence, starting from 0.
-      "error_type": "",            // Type of error (e.g., phát âm sai, bị bỏ qua) only in Vietnamese.
-      "correct_pronunciation": "", // The correct pronunciation of the word.
-      "your_pronunciation": "",    // How the word was pronounced by the user.
-      "explanation": ""            // Explanation of the error only in Vietnamese.
-    }
-  ]
-}
-Note: Words that are correctly pronounced do not need to be listed in the output.
-Begin: \n
-""" + f"reference_text: {reference_text}"
+    passage = state['passage']
+    reference_text = passage.text
+    system_message = passage.error_prompt
     message = [
         SystemMessage(content=system_message),
         HumanMessage(
@@ -34,94 +20,72 @@ Begin: \n
         ])
     ]
 
-    response = structured_output_llm.invoke(message)
-    return {"errors": response["errors"]}
+    errors = invoke_structured(
+        message,
+        lambda data: coerce_errors(data, passage.tokens, passage.word_positions),
+    )
+    return {"errors": errors}
 
 
-def evaluate_speech_metrics_node(state: State) -> State:
-    reference_text = state['reference_text']
-    system_message = """
-You are an English pronunciation assistant. Based on text passage (reference_text)
-and an audio recording of them reading the text (user_input), evaluate the user's speaking performance
-using the IELTS speaking band descriptors. Provide a band score (1–9) for each of the following criteria:
-- Fluency and Coherence
-- Lexical Resource
-- Grammatical Range and Accuracy
-- Pronunciation
-Output: The required output is a JSON containing scores and feedback for each criterion in the following format:
-{
-  "fluency_and_coherence": {
-    "score": ,                // Band score (1–9)
-    "feedback": ""            // Detailed feedback in Vietnamese
-  },
-  "lexical_resource": {
-    "score": ,                // Band score (1–9)
-    "feedback": ""            // Detailed feedback in Vietnamese
-  },
-  "grammatical_range_and_accuracy": {
-    "score": ,                // Band score (1–9)
-    "feedback": ""            // Detailed feedback in Vietnamese
-  },
-  "pronunciation": {
-    "score": ,                // Band score (1–9)
-    "feedback": ""            // Detailed feedback in Vietnamese
-  }
-}
-Begin:
-""" + f"reference_text: {reference_text}"
+@profile_section("reanalyze_flagged_words_node")
+def reanalyze_flagged_words_node(state: State) -> State:
+    passage = state['passage']
+    positions = state['retry_positions']
     message = [
-        SystemMessage(content=system_message),
+        SystemMessage(content=RETRY_ANALYSIS_PROMPT),
         HumanMessage(
         content=[
-            {"type": "text", "text": f"reference_text: {reference_text}"},
+            {"type": "text", "text": f"words_to_check: {build_retry_words(passage.tokens, positions)}"},
             {"type": "media", "mime_type": "audio/mp3", "data": state["base64_audio"]},
         ])
     ]
-    response = structured_output_llm.invoke(message)
+
+    # Re-align reported words only onto the re-checked positions
+    targets = set(positions)
+    word_positions = {
+        word: [position for position in candidates if position in targets]
+        for word, candidates in passage.word_positions.items()
+    }
+    new_errors = invoke_structured(
+        message,
+        lambda data: coerce_errors(data, passage.tokens, word_positions),
+    )
+    return {"errors": merge_errors(state['previous_errors'], new_errors, positions)}
+
+
+@profile_section("evaluate_speech_metrics_node")
+def evaluate_speech_metrics_node(state: State) -> State:
+    passage = state['passage']
+    reference_text = passage.text
+    system_message = passage.metrics_prompt
+    content = [
+        {"type": "text", "text": f"reference_text: {reference_text}"},
+        {"type": "media", "mime_type": "audio/mp3", "data": state["base64_audio"]},
+    ]
+    if state.get("acoustic_features"):
+        features = json.dumps(state["acoustic_features"])
+        content.insert(1, {"type": "text", "text": f"acoustic_features: {features}"})
+    message = [
+        SystemMessage(content=system_message),
+        HumanMessage(content=content)
+    ]
+    response = invoke_structured(message, coerce_measures)
     state["measures"] = response
     return {"measures": response}
 
 
+@profile_section("render_highlighted_html_node")
 def render_highlighted_html_node(state: State) -> State:
-    sentence = state["reference_text"]
-    errors = state["errors"]
-    sentence_list = sentence.split()
-    for error in errors:
-        sentence_list[error["position"]] = f"<span style='color:red'>{sentence_list[error['position']]}</span>"
-    result = " ".join(sentence_list)
-    state["html_output"] = f"<span style='color: green'>{result}</span>"
+    state["html_output"] = state["passage"].render_html(state["errors"])
     return state
 
 
+@profile_section("generate_speaking_report_node")
 def generate_speaking_report_node(test_results):
-    system_message = """
-Bạn là chuyên gia giáo dục tiếng Anh, chuyên đánh giá kỹ năng nói và phát âm. Nhiệm vụ của bạn là phân tích dữ liệu bài kiểm tra nói của người dùng và tạo báo cáo ngắn gọn, sử dụng ít từ.
-
-Báo cáo cần bao gồm:
-- Nhận xét tổng quan: Đánh giá chung mức độ nói tiếng Anh của người dùng (không cần theo dõi tiến triển qua các bài kiểm tra).
-- Lỗi phổ biến: Liệt kê các lỗi thường gặp (ví dụ: thiếu âm cuối, sai nguyên âm,...).
-- Giải pháp cải thiện: Đề xuất các cách khắc phục ngắn gọn.
-
-Yêu cầu: Đầu ra trình bày dưới dạng JSON.
-Ví dụ:
-{
-  "overall_assessment": "Khả năng nói tiếng Anh ở mức trung bình khá. Cần cải thiện phát âm một số âm cơ bản và ngữ điệu.",
-  "common_errors": [
-    "Thiếu âm cuối (ví dụ: 'went' phát âm thành 'wen')",
-    "Sai nguyên âm (ví dụ: 'beach' phát âm sai)",
-    "Ngữ điệu đơn điệu"
-  ],
-  "improvement_suggestions": [
-    "Luyện tập phát âm các âm cuối thường bị bỏ qua.",
-    "Học và luyện tập phát âm các nguyên âm cơ bản.",
-    "Luyện tập ngữ điệu bằng cách nghe và bắt chước người bản xứ.",
-    "Tập trung vào việc liên kết các từ để tạo sự trôi chảy."
-  ]
-}
-"""
+    system_message = SPEAKING_REPORT_PROMPT
     message = [
         SystemMessage(content=system_message),
         HumanMessage(content=[{"type": "text", "text": f"{test_results}"}])
     ]
-    response = structured_output_llm.invoke(message)
+    response = invoke_structured(message, coerce_report)
     return response
\ No newline at end of file
@@ -0,0 +1,113 @@
+import hashlib
+import re
+from functools import lru_cache
+from .prompts import build_error_analysis_prompt, build_speech_metrics_prompt
+from .schemas import normalize_word
+
+_TOKEN_PATTERN = re.compile(r'\S+')
+_HTML_PREFIX = "<span style='color: green'>"
+_HTML_SUFFIX = "</span>"
+
+# Average read-aloud speed used to estimate expected reading duration
+READING_WORDS_PER_MINUTE = 130
+
+
+def make_passage_id(text: str) -> str:
+    """Stable id derived from the whitespace-normalized passage text"""
+    normalized = ' '.join(text.split())
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()[:12]
+
+
+class CompiledPassage:
+    """Precomputed per-passage artifacts reused across requests"""
+
+    __slots__ = (
+        'passage_id',
+        'key',
+        'text',
+        'tokens',
+        'html_offsets',
+        'word_positions',
+        'error_prompt',
+        'metrics_prompt',
+        'html_skeleton',
+        'expected_duration_seconds',
+    )
+
+    def __init__(self, text: str, passage_id: str = None):
+        """
+        Compile a reference passage
+
+        Args:
+            text: Reference text the learner reads
+            passage_id: Catalog id if the passage is registered
+        """
+        matches = list(_TOKEN_PATTERN.finditer(text))
+        self.passage_id = passage_id
+        # Identifies the passage in caches whether or not it is registered
+        self.key = passage_id or make_passage_id(text)
+        self.text = text
+        # Same tokenization as str.split()
+        self.tokens = [match.group() for match in matches]
+        # Normalized word -> token positions, used to re-align LLM output
+        word_positions = {}
+        for position, token in enumerate(self.tokens):
+            word_positions.setdefault(normalize_word(token), []).append(position)
+        self.word_positions = word_positions
+        self.error_prompt = build_error_analysis_prompt(text)
+        self.metrics_prompt = build_speech_metrics_prompt(text)
+        # Rendered output when no word is highlighted, and where each token sits in it
+        self.html_skeleton = f"{_HTML_PREFIX}{' '.join(self.tokens)}{_HTML_SUFFIX}"
+        html_offsets = []
+        offset = len(_HTML_PREFIX)
+        for token in self.tokens:
+            html_offsets.append((offset, offset + len(token)))
+            offset += len(token) + 1
+        self.html_offsets = html_offsets
+        self.expected_duration_seconds = round(len(self.tokens) / READING_WORDS_PER_MINUTE * 60, 2)
+
+    def render_html(self, errors: list) -> str:
+        """Render the passage with mispronounced words highlighted"""
+        positions = {
+            error.get('position') for error in errors
+            if isinstance(error.get('position'), int)
+        }
+        positions = {position for position in positions if 0 <= position < len(self.tokens)}
+        if not positions:
+            return self.html_skeleton
+
+        # Splice highlight tags into the skeleton instead of rebuilding it from tokens
+        parts = []
+        previous_end = 0
+        for position in sorted(positions):
+            start, end = self.html_offsets[position]
+            parts.append(self.html_skeleton[previous_end:start])
+            parts.append(f"<span style='color:red'>{self.tokens[position]}</span>")
+            previous_end = end
+        parts.append(self.html_skeleton[previous_end:])
+        return ''.join(parts)
+
+    def retry_positions(self, errors: list, window: int = 1) -> list:
+        """Positions of previously flagged words plus `window` neighbours on each side"""
+        positions = set()
+        for error in errors:
+            position = error.get('position')
+            if not isinstance(position, int) or not 0 <= position < len(self.tokens):
+                continue
+            positions.update(range(max(position - window, 0), min(position + window + 1, len(self.tokens))))
+        return sorted(positions)
+
+    def to_dict(self) -> dict:
+        """Public description of the passage"""
+        return {
+            'passage_id': self.passage_id,
+            'text': self.text,
+            'word_count': len(self.tokens),
+            'expected_duration_seconds': self.expected_duration_seconds,
+        }
+
+
+@lru_cache(maxsize=256)
+def compile_passage(text: str) -> CompiledPassage:
+    """Compile an ad-hoc (unregistered) passage, caching recent ones"""
+    return CompiledPassage(text)
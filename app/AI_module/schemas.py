@@ -0,0 +1,438 @@
+import json
+import math
+import re
+import threading
+from typing import List, TypedDict
+
+# Output schemas expected from the LLM
+
+
+class PronunciationError(TypedDict):
+    word: str
+    position: int
+    error_type: str
+    correct_pronunciation: str
+    your_pronunciation: str
+    explanation: str
+
+
+class CriterionScore(TypedDict):
+    score: float
+    feedback: str
+
+
+class SpeechMetrics(TypedDict):
+    fluency_and_coherence: CriterionScore
+    lexical_resource: CriterionScore
+    grammatical_range_and_accuracy: CriterionScore
+    pronunciation: CriterionScore
+
+
+class SpeakingReport(TypedDict):
+    overall_assessment: str
+    common_errors: List[str]
+    improvement_suggestions: List[str]
+
+
+SPEECH_METRIC_CRITERIA = tuple(SpeechMetrics.__annotations__)
+ERROR_TEXT_FIELDS = ('error_type', 'correct_pronunciation', 'your_pronunciation', 'explanation')
+MIN_BAND_SCORE = 1
+MAX_BAND_SCORE = 9
+
+_CODE_FENCE_PATTERN = re.compile(r'```(?:json)?\s*(.*?)(?:```|$)', re.DOTALL)
+_NUMBER_PATTERN = re.compile(r'-?\d+(?:[.,]\d+)?')
+_WORD_STRIP_PATTERN = re.compile(r"[^\w']+")
+
+
+class OutputValidationError(ValueError):
+    """Raised when model output cannot be parsed or repaired into the expected schema"""
+
+
+class OutputStats:
+    """Thread-safe counters for structured output parsing"""
+
+    FIELDS = ('calls', 'clean', 'repaired', 'recalls', 'failed')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = dict.fromkeys(self.FIELDS, 0)
+
+    def increment(self, field: str):
+        with self._lock:
+            self._counts[field] += 1
+
+    def snapshot(self) -> dict:
+        """
+        Get current counters and derived rates
+
+        Returns:
+            dict: Raw counts plus repair/re-call rates over all calls
+        """
+        with self._lock:
+            counts = dict(self._counts)
+        calls = counts['calls'] or 1
+        counts['repair_rate'] = round(counts['repaired'] / calls, 4)
+        counts['recall_rate'] = round(counts['recalls'] / calls, 4)
+        return counts
+
+
+output_stats = OutputStats()
+
+
+# JSON repair
+
+# How repair_json recovered the output
+REPAIR_NONE = 'none'            # Valid JSON, possibly wrapped in a code fence or prose
+REPAIR_SYNTAX = 'syntax'        # Complete but malformed (e.g. trailing commas)
+REPAIR_TRUNCATED = 'truncated'  # Cut off: closed and/or trimmed back to complete elements
+
+# Truncated output is trimmed back at most this many elements...
+MAX_TRIM_STEPS = 8
+# ...and never to less than this fraction of the output
+MIN_KEPT_FRACTION = 0.5
+
+_JSON_DECODER = json.JSONDecoder()
+
+
+def _scan_json(text: str):
+    """
+    Tokenize JSON text once, outside strings dropping commas before a
+    closing bracket and recording where it can be cut back to a complete
+    element.
+
+    Returns:
+        tuple: (chars, closers for the end, in_string, escaped,
+                cut points as (length, closers))
+    """
+    chars = []
+    stack = []
+    cuts = []
+    in_string = False
+    escaped = False
+    last_significant = None
+    for char in text:
+        if in_string:
+            chars.append(char)
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif char == '"':
+                in_string = False
+                last_significant = len(chars) - 1
+            continue
+
+        if char in '}]' and last_significant is not None and chars[last_significant] == ',':
+            chars[last_significant] = ''
+        if char == '"':
+            in_string = True
+        elif char in '{[':
+            stack.append('}' if char == '{' else ']')
+            cuts.append((len(chars) + 1, ''.join(reversed(stack))))
+        elif char == ',':
+            cuts.append((len(chars), ''.join(reversed(stack))))
+        elif char in '}]' and stack:
+            stack.pop()
+        chars.append(char)
+        if not char.isspace():
+            last_significant = len(chars) - 1
+
+    return chars, ''.join(reversed(stack)), in_string, escaped, cuts
+
+
+def _close_truncated_json(text: str, closers: str, in_string: bool, escaped: bool) -> str:
+    """Close an unterminated string and any open objects/arrays"""
+    if in_string:
+        # A trailing lone backslash would escape the closing quote
+        text = (text[:-1] if escaped else text) + '"'
+    text = text.rstrip()
+    # Drop a dangling separator or a key without a value
+    text = re.sub(r'(,\s*"[^"]*"\s*:\s*|,\s*|:\s*)$', '', text)
+    return text + closers
+
+
+def repair_json(text: str):
+    """
+    Parse model output as JSON, repairing common defects locally.
+
+    Handles markdown code fences, leading/trailing prose, trailing commas
+    and output truncated mid-value. Truncated output is trimmed back to its
+    last complete elements, within MAX_TRIM_STEPS and MIN_KEPT_FRACTION.
+
+    Args:
+        text: Raw model output
+
+    Returns:
+        tuple: (parsed object, REPAIR_NONE / REPAIR_SYNTAX / REPAIR_TRUNCATED)
+
+    Raises:
+        OutputValidationError: If no JSON object can be recovered
+    """
+    try:
+        return json.loads(text), REPAIR_NONE
+    except (TypeError, ValueError):
+        pass
+
+    candidate = text or ''
+    fence = _CODE_FENCE_PATTERN.search(candidate)
+    if fence:
+        candidate = fence.group(1)
+    start = candidate.find('{')
+    if start == -1:
+        raise OutputValidationError('No JSON object found in model output')
+    candidate = candidate[start:].strip()
+    try:
+        # Ignores prose after the object
+        return _JSON_DECODER.raw_decode(candidate)[0], REPAIR_NONE
+    except ValueError:
+        pass
+
+    chars, closers, in_string, escaped, cuts = _scan_json(candidate)
+    cleaned = ''.join(chars)
+    if not closers and not in_string:
+        try:
+            return _JSON_DECODER.raw_decode(cleaned)[0], REPAIR_SYNTAX
+        except ValueError:
+            # Complete but malformed: trimming would only drop valid data
+            raise OutputValidationError('Model output is not valid JSON')
+
+    try:
+        return json.loads(_close_truncated_json(cleaned, closers, in_string, escaped)), REPAIR_TRUNCATED
+    except ValueError:
+        pass
+
+    min_length = len(candidate) * MIN_KEPT_FRACTION
+    for length, cut_closers in list(reversed(cuts))[:MAX_TRIM_STEPS]:
+        prefix = ''.join(chars[:length])
+        if len(prefix) < min_length:
+            break
+        try:
+            return json.loads(prefix + cut_closers), REPAIR_TRUNCATED
+        except ValueError:
+            continue
+
+    raise OutputValidationError('Model output is not recoverable JSON')
+
+
+# Schema coercion
+
+
+def normalize_word(word) -> str:
+    """Lowercase a word and strip surrounding punctuation for comparison"""
+    return _WORD_STRIP_PATTERN.sub('', str(word)).lower()
+
+
+def _coerce_number(value):
+    """Read a finite number from a JSON value or a string containing one (None otherwise)"""
+    if isinstance(value, bool) or value is None:
+        return None
+    if isinstance(value, (int, float)):
+        try:
+            number = float(value)
+        except OverflowError:
+            return None
+    else:
+        match = _NUMBER_PATTERN.search(str(value))
+        if not match:
+            return None
+        number = float(match.group().replace(',', '.'))
+    # json.loads accepts NaN, Infinity and overflowing literals such as 1e400
+    return number if math.isfinite(number) else None
+
+
+def _coerce_int(value):
+    number = _coerce_number(value)
+    return int(number) if number is not None else None
+
+
+def _coerce_score(value):
+    score = _coerce_number(value)
+    if score is None:
+        return None
+    score = float(min(max(score, MIN_BAND_SCORE), MAX_BAND_SCORE))
+    return int(score) if score.is_integer() else score
+
+
+def _align_position(word: str, position, tokens: list, used: set, word_positions: dict = None):
+    """
+    Find the token index that best matches a reported word.
+
+    Keeps the reported position if it matches, otherwise picks the nearest
+    unused token with the same normalized spelling. A position that matches
+    no token is kept when in range; out-of-range positions are clamped only
+    when no word was reported, since the error cannot be placed otherwise.
+    """
+    target = normalize_word(word)
+    in_range = position is not None and 0 <= position < len(tokens)
+    if in_range and (not target or normalize_word(tokens[position]) == target):
+        return position
+
+    if target:
+        anchor = position if position is not None else 0
+        if word_positions is not None:
+            matches = word_positions.get(target, [])
+        else:
+            matches = [i for i, token in enumerate(tokens) if normalize_word(token) == target]
+        if matches:
+            unused = [i for i in matches if i not in used] or matches
+            return min(unused, key=lambda i: abs(i - anchor))
+
+    if in_range:
+        return position
+    if position is None or target:
+        return None
+    return min(max(position, 0), len(tokens) - 1)
+
+
+def coerce_errors(data, tokens: list, word_positions: dict = None) -> List[PronunciationError]:
+    """
+    Validate and repair the pronunciation error list against the reference tokens.
+
+    Args:
+        data: Parsed model output ({"errors": [...]})
+        tokens: Tokenized reference text
+        word_positions: Optional precomputed normalized word -> positions index
+
+    Returns:
+        list: Errors with integer positions inside the reference text
+
+    Raises:
+        OutputValidationError: If the output has no "errors" list
+    """
+    raw_errors = data.get('errors') if isinstance(data, dict) else None
+    if not isinstance(raw_errors, list):
+        raise OutputValidationError('Expected an "errors" list in model output')
+
+    if not tokens:
+        return []
+
+    errors = []
+    used = set()
+    for raw in raw_errors:
+        if not isinstance(raw, dict):
+            continue
+        position = _align_position(
+            raw.get('word', ''), _coerce_int(raw.get('position')), tokens, used, word_positions
+        )
+        if position is None or position in used:
+            continue
+        used.add(position)
+
+        error = PronunciationError(
+            word=str(raw.get('word') or tokens[position]),
+            position=position,
+            **{field: str(raw.get(field) or '') for field in ERROR_TEXT_FIELDS},
+        )
+        errors.append(error)
+
+    errors.sort(key=lambda error: error['position'])
+    return errors
+
+
+def merge_errors(previous: list, new: list, rechecked_positions) -> List[PronunciationError]:
+    """
+    Merge a targeted re-check into a previous error list.
+
+    Errors at re-checked positions are replaced by the new findings; all
+    other previous errors are kept as they were.
+
+    Args:
+        previous: Errors from the earlier analysis
+        new: Errors found by the re-check
+        rechecked_positions: Positions that were re-checked
+
+    Returns:
+        list: Merged errors sorted by position
+    """
+    rechecked = set(rechecked_positions)
+    merged = [error for error in previous if error.get('position') not in rechecked]
+    merged.extend(error for error in new if error['position'] in rechecked)
+    merged.sort(key=lambda error: error['position'])
+    return merged
+
+
+def coerce_measures(data) -> SpeechMetrics:
+    """
+    Validate and repair IELTS criterion scores.
+
+    Args:
+        data: Parsed model output
+
+    Returns:
+        dict: Every criterion with a numeric band score in [1, 9]
+
+    Raises:
+        OutputValidationError: If a criterion or its score is missing
+    """
+    if not isinstance(data, dict):
+        raise OutputValidationError('Expected a JSON object of criteria')
+
+    measures = {}
+    for criterion in SPEECH_METRIC_CRITERIA:
+        entry = data.get(criterion)
+        if isinstance(entry, dict):
+            score, feedback = _coerce_score(entry.get('score')), entry.get('feedback')
+        else:
+            score, feedback = _coerce_score(entry), None
+        if score is None:
+            raise OutputValidationError(f'Missing score for "{criterion}"')
+        measures[criterion] = CriterionScore(score=score, feedback=str(feedback or ''))
+    return SpeechMetrics(**measures)
+
+
+def coerce_report(data) -> SpeakingReport:
+    """
+    Validate and repair the speaking report.
+
+    Args:
+        data: Parsed model output
+
+    Returns:
+        dict: Report with string assessment and lists of strings
+
+    Raises:
+        OutputValidationError: If the overall assessment is missing
+    """
+    if not isinstance(data, dict) or not data.get('overall_assessment'):
+        raise OutputValidationError('Missing "overall_assessment" in model output')
+
+    def as_list(value):
+        if value is None:
+            return []
+        if isinstance(value, (list, tuple)):
+            return [str(item) for item in value if item]
+        return [str(value)]
+
+    return SpeakingReport(
+        overall_assessment=str(data['overall_assessment']),
+        common_errors=as_list(data.get('common_errors')),
+        improvement_suggestions=as_list(data.get('improvement_suggestions')),
+    )
+
+
+# Local results for recordings without speech
+
+SILENT_RECORDING_FEEDBACK = 'Không phát hiện giọng nói trong bản ghi âm.'
+
+
+def silent_recording_errors(tokens: list) -> List[PronunciationError]:
+    """Every word is omitted when the recording contains no speech"""
+    return [
+        PronunciationError(
+            word=token,
+            position=position,
+            error_type='bị bỏ qua',
+            correct_pronunciation='',
+            your_pronunciation='',
+            explanation=SILENT_RECORDING_FEEDBACK,
+        )
+        for position, token in enumerate(tokens)
+    ]
+
+
+def silent_recording_measures() -> SpeechMetrics:
+    """Lowest band for every criterion when the recording contains no speech"""
+    return SpeechMetrics(**{
+        criterion: CriterionScore(score=MIN_BAND_SCORE, feedback=SILENT_RECORDING_FEEDBACK)
+        for criterion in SPEECH_METRIC_CRITERIA
+    })
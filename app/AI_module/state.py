@@ -1,9 +1,14 @@
 from typing import TypedDict
+from .passages import CompiledPassage
 
 
 class State(TypedDict):
     reference_text: str
+    passage: CompiledPassage
     base64_audio: str
     errors: list
     measures: list
-    html_output: str
\ No newline at end of file
+    html_output: str
+    acoustic_features: dict
+    previous_errors: list
+    retry_positions: list
\ No newline at end of file
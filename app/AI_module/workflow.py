@@ -3,6 +3,7 @@ from .nodes import (
     analyze_pronunciation_errors_node,
     evaluate_speech_metrics_node,
     generate_speaking_report_node,
+    reanalyze_flagged_words_node,
     render_highlighted_html_node,
 )
 from .state import State
@@ -19,6 +20,18 @@ pronunciation_error_workflow.add_edge("render_highlighted_html_node", END)
 
 pronunciation_error_workflow = pronunciation_error_workflow.compile()
 
+# Workflow 1b: Pronunciation Retry Workflow (re-checks only previously flagged words)
+pronunciation_retry_workflow = StateGraph(State)
+
+pronunciation_retry_workflow.add_node("reanalyze_flagged_words_node", reanalyze_flagged_words_node)
+pronunciation_retry_workflow.add_node("render_highlighted_html_node", render_highlighted_html_node)
+
+pronunciation_retry_workflow.add_edge(START, "reanalyze_flagged_words_node")
+pronunciation_retry_workflow.add_edge("reanalyze_flagged_words_node", "render_highlighted_html_node")
+pronunciation_retry_workflow.add_edge("render_highlighted_html_node", END)
+
+pronunciation_retry_workflow = pronunciation_retry_workflow.compile()
+
 # Workflow 2: Speech Metrics Workflow
 speech_metrics_workflow = StateGraph(State)
 
@@ -40,6 +40,22 @@ def create_app():
     else:
         app.limiter = None
 
+    # Initialize on-demand request profiling
+    from app.utils.profiling import init_profiling
+    init_profiling(app)
+
+    # Load registered reference passages
+    from app.services.passage_catalog import init_passage_catalog
+    init_passage_catalog(app)
+
+    # Configure duplicate submission detection
+    from app.services.duplicate_detection import init_duplicate_detection
+    init_duplicate_detection(app)
+
+    # Configure the analysis result store used by practice retries
+    from app.services.result_store import init_result_store
+    init_result_store(app)
+
     from app.routes.api import bp as api_bp
     app.register_blueprint(api_bp, url_prefix='/api/v1')
     
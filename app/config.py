@@ -29,5 +29,50 @@ class Config:
     # Utility endpoints (health checks, stats)
     RATELIMIT_UTILITY_ENDPOINTS = os.environ.get('RATELIMIT_UTILITY_ENDPOINTS', '100 per hour')
 
+    # Passage catalog: registered passages are persisted here (empty = in-memory only)
+    PASSAGE_CATALOG_PATH = os.environ.get('PASSAGE_CATALOG_PATH', './data/passages.json')
+    PASSAGE_CATALOG_MAX_PASSAGES = int(os.environ.get('PASSAGE_CATALOG_MAX_PASSAGES', '1000'))
+    # Longest passage text accepted for registration (characters)
+    PASSAGE_MAX_CHARS = int(os.environ.get('PASSAGE_MAX_CHARS', '5000'))
+    # Sent in the X-Catalog-Token header to register passages (unset = registration disabled)
+    PASSAGE_CATALOG_TOKEN = os.environ.get('PASSAGE_CATALOG_TOKEN')
+
+    # Duplicate submission detection (perceptual audio fingerprints)
+    FINGERPRINT_ENABLED = os.environ.get('FINGERPRINT_ENABLED', 'true').lower() == 'true'
+    # Minimum fingerprint similarity (0-1) to reuse a prior result; re-encodes score ~0.75-1.0,
+    # other takes of the same passage < 0.6, unrelated audio ~0.5
+    FINGERPRINT_SIMILARITY_THRESHOLD = float(os.environ.get('FINGERPRINT_SIMILARITY_THRESHOLD', '0.70'))
+    # Index directory shared by all workers (empty = per-process memory, single worker only)
+    FINGERPRINT_DIR = os.environ.get('FINGERPRINT_DIR', './data/fingerprints')
+    FINGERPRINT_MAX_ENTRIES = int(os.environ.get('FINGERPRINT_MAX_ENTRIES', '2000'))
+    FINGERPRINT_MAX_PER_PASSAGE = int(os.environ.get('FINGERPRINT_MAX_PER_PASSAGE', '32'))
+    FINGERPRINT_TTL_SECONDS = int(os.environ.get('FINGERPRINT_TTL_SECONDS', '86400'))
+
+    # Local acoustic features (speech rate, pauses); near-silent recordings skip the LLM
+    ACOUSTIC_FEATURES_ENABLED = os.environ.get('ACOUSTIC_FEATURES_ENABLED', 'true').lower() == 'true'
+
+    # Practice retries: results are cached so a retry can reference them by id
+    # Directory shared by all workers (empty = per-process memory, single worker only)
+    RESULT_CACHE_DIR = os.environ.get('RESULT_CACHE_DIR', './data/results')
+    RESULT_CACHE_MAX_ENTRIES = int(os.environ.get('RESULT_CACHE_MAX_ENTRIES', '1000'))
+    RESULT_CACHE_TTL_SECONDS = int(os.environ.get('RESULT_CACHE_TTL_SECONDS', '3600'))
+    # Neighbouring words re-checked on each side of a previously flagged word
+    RETRY_CONTEXT_WINDOW = int(os.environ.get('RETRY_CONTEXT_WINDOW', '1'))
+
+    # LLM output handling: extra calls allowed when output cannot be repaired locally
+    LLM_MAX_RECALLS = int(os.environ.get('LLM_MAX_RECALLS', '1'))
+
+    # Profiling configuration (opt-in, no overhead when disabled)
+    PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', 'false').lower() == 'true'
+    # Fraction of requests profiled automatically (0.0 = only on header opt-in)
+    PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE', '0.0'))
+    # Request header that opts a single request into profiling
+    PROFILING_HEADER = os.environ.get('PROFILING_HEADER', 'X-Profile')
+    # Header value required for opt-in and the /profiles endpoints (unset = both disabled)
+    PROFILING_TOKEN = os.environ.get('PROFILING_TOKEN')
+    PROFILING_DIR = os.environ.get('PROFILING_DIR', './profiles')
+    PROFILING_MAX_PROFILES = int(os.environ.get('PROFILING_MAX_PROFILES', '50'))
+    PROFILING_TRACEMALLOC = os.environ.get('PROFILING_TRACEMALLOC', 'true').lower() == 'true'
+
     # Set environment variables
     os.environ["GOOGLE_API_KEY"] = os.getenv('GOOGLE_API_KEY')
@@ -1,12 +1,20 @@
 import base64
+import hmac
+import json
+from app.AI_module.passages import compile_passage
 from app.services.ai_agent import (
     analyze_pronunciation, 
     evaluate_speech_metrics,
     generate_speaking_report,
 )
+from app.services.duplicate_detection import duplicate_detector
+from app.services.passage_catalog import passage_catalog
+from app.services.result_store import result_store
+from app.utils.audio import try_decode_audio
 from app.utils.file_utils import allowed_file
+from app.utils.profiling import has_profiling_token
 from app.utils.cleanup import FileCleanupService
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, request, jsonify, current_app, send_file
 
 
 bp = Blueprint('api', __name__)
@@ -15,6 +23,56 @@ def get_limiter():
     """Get the limiter instance from current app"""
     return current_app.limiter if hasattr(current_app, 'limiter') and current_app.limiter else None
 
+def resolve_passage():
+    """
+    Resolve the reference passage from `passage_id` (registered) or `text` (ad-hoc).
+
+    Returns:
+        tuple: (reference_text, passage or None, error response or None)
+    """
+    passage_id = request.form.get('passage_id')
+    if passage_id:
+        passage = passage_catalog.get(passage_id)
+        if passage is None:
+            return None, None, (jsonify({'error': 'Unknown passage_id'}), 404)
+        return passage.text, passage, None
+
+    if 'text' not in request.form:
+        return None, None, (jsonify({'error': 'Missing text'}), 400)
+    return request.form['text'], None, None
+
+def resolve_previous_errors(passage_key):
+    """
+    Resolve the errors of a previous attempt for retry mode, from `previous_result_id`
+    (cached result) or `previous_result` (JSON result or error list).
+
+    Returns:
+        tuple: (previous errors or None, error response or None)
+    """
+    previous_result_id = request.form.get('previous_result_id')
+    if previous_result_id:
+        stored = result_store.get(previous_result_id)
+        if stored is None:
+            return None, (jsonify({'error': 'Unknown or expired previous_result_id'}), 404)
+        stored_passage_key, previous_result = stored
+        if stored_passage_key != passage_key:
+            return None, (jsonify({'error': 'previous_result_id belongs to a different passage'}), 400)
+        return previous_result['errors'], None
+
+    previous_result = request.form.get('previous_result')
+    if previous_result:
+        try:
+            previous_result = json.loads(previous_result)
+        except ValueError:
+            return None, (jsonify({'error': 'previous_result is not valid JSON'}), 400)
+        if isinstance(previous_result, dict):
+            previous_result = previous_result.get('errors')
+        if not isinstance(previous_result, list):
+            return None, (jsonify({'error': 'previous_result must contain an errors list'}), 400)
+        return previous_result, None
+
+    return None, None
+
 def limit_decorator(limit_string):
     """Decorator factory that applies rate limit if limiter is enabled"""
     def decorator(f):
@@ -40,23 +98,33 @@ def analyze():
     if 'audio' not in request.files:
         return jsonify({'error': 'Missing audio file'}), 400
 
-    if 'text' not in request.form:
-        return jsonify({'error': 'Missing text'}), 400
+    reference_text, passage, error_response = resolve_passage()
+    if error_response:
+        return error_response
+
+    if passage is None:
+        passage = compile_passage(reference_text)
+    previous_errors, error_response = resolve_previous_errors(passage.key)
+    if error_response:
+        return error_response
     
     audio_file = request.files['audio']
-    reference_text = request.form['text']
 
     if not allowed_file(audio_file.filename):
         return jsonify({'error': 'Invalid file type'}), 400
 
 
     try:
-        base64_audio = base64.b64encode(audio_file.read()).decode('utf-8')
+        audio_bytes = audio_file.read()
+        base64_audio = base64.b64encode(audio_bytes).decode('utf-8')
+        # Decoded audio is only needed for local analysis
+        needs_samples = duplicate_detector.enabled or current_app.config.get('ACOUSTIC_FEATURES_ENABLED', True)
+        samples = try_decode_audio(audio_bytes) if needs_samples else None
         # Save uploaded file
         # audio_path = save_uploaded_file(audio_file)
         
         # Process with AI Agent
-        result = analyze_pronunciation(reference_text, base64_audio)
+        result = analyze_pronunciation(reference_text, base64_audio, passage, samples, previous_errors)
         
         return jsonify({
             'data': result,
@@ -83,23 +151,27 @@ def evaluate():
     if 'audio' not in request.files:
         return jsonify({'error': 'Missing audio file'}), 400
 
-    if 'text' not in request.form:
-        return jsonify({'error': 'Missing text'}), 400
+    reference_text, passage, error_response = resolve_passage()
+    if error_response:
+        return error_response
     
     audio_file = request.files['audio']
-    reference_text = request.form['text']
 
     if not allowed_file(audio_file.filename):
         return jsonify({'error': 'Invalid file type'}), 400
 
 
     try:
-        base64_audio = base64.b64encode(audio_file.read()).decode('utf-8')
+        audio_bytes = audio_file.read()
+        base64_audio = base64.b64encode(audio_bytes).decode('utf-8')
+        # Decoded audio is only needed for local analysis
+        needs_samples = duplicate_detector.enabled or current_app.config.get('ACOUSTIC_FEATURES_ENABLED', True)
+        samples = try_decode_audio(audio_bytes) if needs_samples else None
         # Save uploaded file
         # audio_path = save_uploaded_file(audio_file)
         
         # Process with AI Agent
-        result = evaluate_speech_metrics(reference_text, base64_audio)
+        result = evaluate_speech_metrics(reference_text, base64_audio, passage, samples)
         
         return jsonify({
             'data': result,
@@ -136,6 +208,81 @@ def summary():
         return jsonify({'error': str(e)}), 500
 
 
+@bp.route('/passages', methods=['POST'])
+def register_passage():
+    """
+    Register a reference passage so requests can send `passage_id` instead of text.
+    Rate limit: 20 requests per hour (moderate cost)
+    """
+    # Apply rate limit dynamically
+    limiter = get_limiter()
+    if limiter:
+        limit_string = current_app.config.get('RATELIMIT_REPORT_ENDPOINT', '20 per hour')
+        limiter.limit(limit_string)(lambda: None)()
+
+    token = current_app.config.get('PASSAGE_CATALOG_TOKEN')
+    header_value = request.headers.get('X-Catalog-Token', '')
+    if not token or not hmac.compare_digest(header_value.encode('utf-8'), token.encode('utf-8')):
+        return jsonify({'error': 'Missing or invalid catalog token'}), 403
+
+    payload = request.get_json(silent=True) or request.form
+    if not isinstance(payload, dict):
+        return jsonify({'error': 'Expected a JSON object'}), 400
+    if not payload.get('text'):
+        return jsonify({'error': 'Missing text'}), 400
+
+    try:
+        passage = passage_catalog.register(payload['text'], payload.get('title'))
+        return jsonify({
+            'status': 'success',
+            'data': passage_catalog.describe(passage)
+        })
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/passages', methods=['GET'])
+def list_passages():
+    """
+    List registered passages.
+    Rate limit: 100 requests per hour (utility endpoint)
+    """
+    # Apply rate limit dynamically
+    limiter = get_limiter()
+    if limiter:
+        limit_string = current_app.config.get('RATELIMIT_UTILITY_ENDPOINTS', '100 per hour')
+        limiter.limit(limit_string)(lambda: None)()
+
+    return jsonify({
+        'status': 'success',
+        'data': passage_catalog.list_passages()
+    })
+
+
+@bp.route('/passages/<passage_id>', methods=['GET'])
+def get_passage(passage_id):
+    """
+    Get a registered passage.
+    Rate limit: 100 requests per hour (utility endpoint)
+    """
+    # Apply rate limit dynamically
+    limiter = get_limiter()
+    if limiter:
+        limit_string = current_app.config.get('RATELIMIT_UTILITY_ENDPOINTS', '100 per hour')
+        limiter.limit(limit_string)(lambda: None)()
+
+    passage = passage_catalog.get(passage_id)
+    if passage is None:
+        return jsonify({'error': 'Passage not found'}), 404
+
+    return jsonify({
+        'status': 'success',
+        'data': passage_catalog.describe(passage)
+    })
+
+
 @bp.route('/health-check', methods=['GET'])
 def health_check():
     """
@@ -176,6 +323,44 @@ def storage_stats():
         return jsonify({'error': str(e)}), 500
 
 
+@bp.route('/llm-output-stats', methods=['GET'])
+def llm_output_stats():
+    """
+    Get LLM output parsing statistics (clean, locally repaired, re-called, failed).
+    Rate limit: 100 requests per hour (utility endpoint)
+    """
+    # Apply rate limit dynamically
+    limiter = get_limiter()
+    if limiter:
+        limit_string = current_app.config.get('RATELIMIT_UTILITY_ENDPOINTS', '100 per hour')
+        limiter.limit(limit_string)(lambda: None)()
+
+    from app.AI_module.schemas import output_stats
+
+    return jsonify({
+        'status': 'success',
+        'data': output_stats.snapshot()
+    })
+
+
+@bp.route('/duplicate-stats', methods=['GET'])
+def duplicate_stats():
+    """
+    Get duplicate submission detection statistics (hits, index size, timings).
+    Rate limit: 100 requests per hour (utility endpoint)
+    """
+    # Apply rate limit dynamically
+    limiter = get_limiter()
+    if limiter:
+        limit_string = current_app.config.get('RATELIMIT_UTILITY_ENDPOINTS', '100 per hour')
+        limiter.limit(limit_string)(lambda: None)()
+
+    return jsonify({
+        'status': 'success',
+        'data': duplicate_detector.get_stats()
+    })
+
+
 @bp.route('/cleanup-uploads', methods=['POST'])
 def cleanup_uploads():
     """
@@ -200,4 +385,66 @@ def cleanup_uploads():
             'data': result
         })
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
\ No newline at end of file
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/profiles', methods=['GET'])
+def list_profiles():
+    """
+    List captured request profiles (newest first).
+    Rate limit: 100 requests per hour (utility endpoint)
+    """
+    # Apply rate limit dynamically
+    limiter = get_limiter()
+    if limiter:
+        limit_string = current_app.config.get('RATELIMIT_UTILITY_ENDPOINTS', '100 per hour')
+        limiter.limit(limit_string)(lambda: None)()
+
+    profile_store = getattr(current_app, 'profile_store', None)
+    if not profile_store:
+        return jsonify({'error': 'Profiling is disabled'}), 404
+    if not has_profiling_token(current_app, request):
+        return jsonify({'error': 'Missing or invalid profiling token'}), 403
+
+    try:
+        return jsonify({
+            'status': 'success',
+            'data': profile_store.list_profiles()
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/profiles/<profile_id>', methods=['GET'])
+def download_profile(profile_id):
+    """
+    Download a captured profile.
+    Query param `format`: `summary` (JSON, default) or `pstats` (raw cProfile data).
+    Rate limit: 100 requests per hour (utility endpoint)
+    """
+    # Apply rate limit dynamically
+    limiter = get_limiter()
+    if limiter:
+        limit_string = current_app.config.get('RATELIMIT_UTILITY_ENDPOINTS', '100 per hour')
+        limiter.limit(limit_string)(lambda: None)()
+
+    profile_store = getattr(current_app, 'profile_store', None)
+    if not profile_store:
+        return jsonify({'error': 'Profiling is disabled'}), 404
+    if not has_profiling_token(current_app, request):
+        return jsonify({'error': 'Missing or invalid profiling token'}), 403
+
+    fmt = request.args.get('format', 'summary')
+    if fmt not in ('summary', 'pstats'):
+        return jsonify({'error': 'Invalid format'}), 400
+
+    path = profile_store.get_path(profile_id, fmt)
+    if path is None:
+        return jsonify({'error': 'Profile not found'}), 404
+
+    return send_file(
+        path.resolve(),
+        mimetype='application/json' if fmt == 'summary' else 'application/octet-stream',
+        as_attachment=fmt == 'pstats',
+        download_name=path.name,
+    )
@@ -1,42 +1,141 @@
+from app.AI_module.passages import compile_passage
+from app.AI_module.schemas import coerce_errors, silent_recording_errors, silent_recording_measures
 from app.AI_module.state import State
 from app.AI_module.workflow import (
     pronunciation_error_workflow,
+    pronunciation_retry_workflow,
     speech_metrics_workflow,
     summary_workflow,
 )
+from app.config import Config
+from app.services.duplicate_detection import duplicate_detector
+from app.services.result_store import result_store
+from app.utils.acoustic_features import extract_features
+from app.utils.profiling import profiled_block
 
 
-def analyze_pronunciation(reference_text: str, base64_audio: str):
+def extract_acoustic_features(samples, passage):
+    """Local fluency features for decoded audio (None if disabled or not decoded)"""
+    if samples is None or not Config.ACOUSTIC_FEATURES_ENABLED:
+        return None
+    with profiled_block("extract_acoustic_features"):
+        return extract_features(samples, word_count=len(passage.tokens))
+
+
+def analyze_pronunciation(reference_text: str, base64_audio: str, passage=None, samples=None,
+                          previous_errors=None):
+    if passage is None:
+        passage = compile_passage(reference_text)
+    if previous_errors:
+        # Errors may come from the client, so clean them like LLM output
+        previous_errors = coerce_errors(
+            {'errors': previous_errors}, passage.tokens, passage.word_positions
+        )
+
+    features = extract_acoustic_features(samples, passage)
+    if features and features['is_silent']:
+        errors = silent_recording_errors(passage.tokens)
+        result = {
+            'errors': errors,
+            'measures': [],
+            'html_output': passage.render_html(errors),
+        }
+    else:
+        result = _run_error_analysis(passage, base64_audio, samples, features, previous_errors)
+
+    if features:
+        result['acoustic_features'] = features
+    result['result_id'] = result_store.save(passage.key, {'errors': result['errors']})
+    return result
+
+
+def _run_error_analysis(passage, base64_audio, samples, features, previous_errors):
+    fingerprint = duplicate_detector.fingerprint(samples)
+    duplicate = duplicate_detector.find('errors', passage.key, fingerprint)
+    if duplicate:
+        result, similarity = duplicate
+        result['duplicate_similarity'] = round(similarity, 4)
+        return result
+
+    # Retries only re-check previously flagged words and their neighbours
+    retry_positions = []
+    if previous_errors:
+        retry_positions = passage.retry_positions(previous_errors, Config.RETRY_CONTEXT_WINDOW)
+
     initial_state = State(
-        reference_text=reference_text,
+        reference_text=passage.text,
+        passage=passage,
         base64_audio=base64_audio,
         errors=[],
         measures=[],
         html_output="",
+        acoustic_features=features or {},
+        previous_errors=previous_errors or [],
+        retry_positions=retry_positions,
     )
-    
-    result = pronunciation_error_workflow.invoke(initial_state)
-    return {
+
+    if retry_positions:
+        with profiled_block("pronunciation_retry_workflow.invoke"):
+            result = pronunciation_retry_workflow.invoke(initial_state)
+    else:
+        with profiled_block("pronunciation_error_workflow.invoke"):
+            result = pronunciation_error_workflow.invoke(initial_state)
+    result = {
         'errors': result['errors'],
         'measures': result['measures'],
         'html_output': result['html_output'],
     }
+    if retry_positions:
+        # A merged retry is only partly based on this audio, so it is not reusable
+        result['rechecked_positions'] = retry_positions
+    else:
+        duplicate_detector.remember('errors', passage.key, fingerprint, result)
+    return result
+
+
+def evaluate_speech_metrics(reference_text: str, base64_audio: str, passage=None, samples=None):
+    if passage is None:
+        passage = compile_passage(reference_text)
+
+    features = extract_acoustic_features(samples, passage)
+    if features and features['is_silent']:
+        return {
+            'measures': silent_recording_measures(),
+            'acoustic_features': features,
+        }
 
+    fingerprint = duplicate_detector.fingerprint(samples)
+    duplicate = duplicate_detector.find('measures', passage.key, fingerprint)
+    if duplicate:
+        result, similarity = duplicate
+        result['duplicate_similarity'] = round(similarity, 4)
+        if features:
+            result['acoustic_features'] = features
+        return result
 
-def evaluate_speech_metrics(reference_text: str, base64_audio: str):
     initial_state = State(
-        reference_text=reference_text,
+        reference_text=passage.text,
+        passage=passage,
         base64_audio=base64_audio,
         errors=[],
         measures=[],
         html_output="",
+        acoustic_features=features or {},
+        previous_errors=[],
+        retry_positions=[],
     )
     
-    result = speech_metrics_workflow.invoke(initial_state)
-    return {
+    with profiled_block("speech_metrics_workflow.invoke"):
+        result = speech_metrics_workflow.invoke(initial_state)
+    result = {
         'measures': result['measures'],
     }
+    duplicate_detector.remember('measures', passage.key, fingerprint, result)
+    if features:
+        result['acoustic_features'] = features
+    return result
 
 
 def generate_speaking_report(test_results: str):
-    return summary_workflow.invoke(test_results)
\ No newline at end of file
+    with profiled_block("summary_workflow.invoke"):
+        return summary_workflow.invoke(test_results)
\ No newline at end of file
@@ -0,0 +1,131 @@
+import copy
+import logging
+import threading
+import time
+from app.utils.audio_fingerprint import (
+    DEFAULT_SIMILARITY_THRESHOLD,
+    FileFingerprintIndex,
+    FingerprintIndex,
+    compute_fingerprint,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class DuplicateDetector:
+    """Detects re-uploads of the same recording and reuses their analysis results"""
+
+    def __init__(self, enabled: bool = True, **index_options):
+        """
+        Initialize duplicate detector
+
+        Args:
+            enabled: Whether fingerprinting runs at all
+            index_options: Options forwarded to FingerprintIndex
+        """
+        self.enabled = enabled
+        self.index = FingerprintIndex(**index_options)
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'fingerprints': 0,
+            'fingerprint_ms_total': 0.0,
+            'lookup_ms_total': 0.0,
+        }
+
+    def fingerprint(self, samples):
+        """Compute the fingerprint of decoded audio (None if disabled or unavailable)"""
+        if not self.enabled or samples is None:
+            return None
+        start = time.perf_counter()
+        fingerprint = compute_fingerprint(samples)
+        with self._lock:
+            self._stats['fingerprints'] += 1
+            self._stats['fingerprint_ms_total'] += (time.perf_counter() - start) * 1000
+        return fingerprint
+
+    def find(self, kind: str, passage_key: str, fingerprint):
+        """
+        Find a prior result for a near-identical recording of the same passage
+
+        Args:
+            kind: Analysis type (e.g. 'errors', 'measures')
+            passage_key: Key of the reference passage
+            fingerprint: Fingerprint of the submitted audio
+
+        Returns:
+            tuple: (copy of prior result, similarity) or None
+        """
+        if fingerprint is None:
+            return None
+
+        start = time.perf_counter()
+        match = self.index.lookup((kind, passage_key), fingerprint)
+        with self._lock:
+            self._stats['lookup_ms_total'] += (time.perf_counter() - start) * 1000
+            self._stats['hits' if match else 'misses'] += 1
+
+        if match is None:
+            return None
+        result, similarity = match
+        logger.info(f"Reusing {kind} result for passage {passage_key} (similarity={similarity:.3f})")
+        return copy.deepcopy(result), similarity
+
+    def remember(self, kind: str, passage_key: str, fingerprint, result):
+        """Store a fresh analysis result under its fingerprint"""
+        if fingerprint is not None:
+            self.index.add((kind, passage_key), fingerprint, copy.deepcopy(result))
+
+    def get_stats(self) -> dict:
+        """
+        Get duplicate detection statistics
+
+        Returns:
+            dict: Hit/miss counts, index size and average timings
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats['hits'] + stats['misses']
+        fingerprints = stats['fingerprints']
+        return {
+            'enabled': self.enabled,
+            'indexed_recordings': len(self.index),
+            'hits': stats['hits'],
+            'misses': stats['misses'],
+            'hit_rate': round(stats['hits'] / lookups, 4) if lookups else 0.0,
+            'avg_fingerprint_ms': (
+                round(stats['fingerprint_ms_total'] / fingerprints, 3) if fingerprints else 0.0
+            ),
+            'avg_lookup_ms': round(stats['lookup_ms_total'] / lookups, 3) if lookups else 0.0,
+        }
+
+
+# Global detector instance
+duplicate_detector = DuplicateDetector(enabled=False)
+
+
+def init_duplicate_detection(app):
+    """
+    Configure duplicate detection from app config
+
+    Args:
+        app: Flask application instance
+    """
+    duplicate_detector.enabled = app.config.get('FINGERPRINT_ENABLED', True)
+    index_options = dict(
+        threshold=app.config.get('FINGERPRINT_SIMILARITY_THRESHOLD', DEFAULT_SIMILARITY_THRESHOLD),
+        max_entries=app.config.get('FINGERPRINT_MAX_ENTRIES', 2000),
+        max_per_key=app.config.get('FINGERPRINT_MAX_PER_PASSAGE', 32),
+        ttl_seconds=app.config.get('FINGERPRINT_TTL_SECONDS', 86400),
+    )
+    index_dir = app.config.get('FINGERPRINT_DIR')
+    # A shared directory lets every gunicorn worker find uploads seen by the others
+    if index_dir:
+        duplicate_detector.index = FileFingerprintIndex(index_dir, **index_options)
+    else:
+        duplicate_detector.index = FingerprintIndex(**index_options)
+    logger.info(
+        f"Duplicate detection {'enabled' if duplicate_detector.enabled else 'disabled'}: "
+        f"threshold={duplicate_detector.index.threshold}, dir={index_dir or 'in-memory'}"
+    )
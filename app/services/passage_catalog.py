@@ -0,0 +1,218 @@
+import json
+import logging
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from app.AI_module.passages import CompiledPassage, make_passage_id
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, single worker only
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class PassageCatalog:
+    """
+    Registry of reference passages with precompiled artifacts.
+
+    With a catalog_path the JSON file is the source of truth shared by all
+    worker processes: lookups that miss re-read it when it has changed, and
+    registrations merge its current contents under a file lock before writing.
+    """
+
+    def __init__(self, catalog_path: str = None, max_passages: int = 1000, max_chars: int = 5000):
+        """
+        Initialize passage catalog
+
+        Args:
+            catalog_path: JSON file used to persist registered passages (None = in-memory only)
+            max_passages: Maximum number of registered passages
+            max_chars: Maximum length of a registered passage text
+        """
+        self.catalog_path = Path(catalog_path) if catalog_path else None
+        self.max_passages = max_passages
+        self.max_chars = max_chars
+        self._passages = {}
+        self._titles = {}
+        self._loaded_mtime = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Load and compile passages persisted in catalog_path"""
+        with self._lock:
+            self._refresh(force=True)
+        if self.catalog_path:
+            logger.info(f"Loaded {len(self._passages)} passages from {self.catalog_path}")
+
+    @staticmethod
+    def _is_valid_entry(entry) -> bool:
+        """Check that a persisted entry has a string id, non-empty text and an optional string title"""
+        return (
+            isinstance(entry, dict)
+            and isinstance(entry.get('passage_id'), str)
+            and isinstance(entry.get('text'), str)
+            and bool(entry['text'].strip())
+            and isinstance(entry.get('title'), (str, type(None)))
+        )
+
+    def _file_mtime(self):
+        try:
+            return self.catalog_path.stat().st_mtime_ns
+        except OSError:
+            return None
+
+    def _read_entries(self) -> list:
+        """Read valid entries from catalog_path (empty if missing or unreadable)"""
+        try:
+            with open(self.catalog_path, encoding='utf-8') as f:
+                entries = json.load(f)
+        except FileNotFoundError:
+            return []
+        except (OSError, ValueError) as e:
+            logger.error(f"Failed to load passage catalog {self.catalog_path}: {str(e)}")
+            return []
+
+        if not isinstance(entries, list):
+            logger.error(f"Ignoring passage catalog {self.catalog_path}: expected a list of passages")
+            return []
+
+        valid = []
+        for entry in entries:
+            if self._is_valid_entry(entry):
+                valid.append(entry)
+            else:
+                logger.warning(f"Skipping malformed passage catalog entry: {str(entry)[:100]}")
+        return valid
+
+    def _refresh(self, force: bool = False):
+        """Merge passages other workers persisted since the last read (caller holds the lock)"""
+        if not self.catalog_path:
+            return
+        mtime = self._file_mtime()
+        if mtime is None or (mtime == self._loaded_mtime and not force):
+            return
+
+        for entry in self._read_entries():
+            passage_id = entry['passage_id']
+            if passage_id in self._passages:
+                continue
+            if len(self._passages) >= self.max_passages:
+                break
+            self._passages[passage_id] = CompiledPassage(entry['text'], passage_id)
+            self._titles[passage_id] = entry.get('title')
+        self._loaded_mtime = mtime
+
+    @contextmanager
+    def _file_lock(self):
+        """Serialize read-merge-write cycles across worker processes"""
+        if not self.catalog_path or fcntl is None:
+            yield
+            return
+        self.catalog_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.catalog_path.with_suffix('.lock'), 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _save(self):
+        """Persist registered passages (caller holds both locks)"""
+        if not self.catalog_path:
+            return
+        self.catalog_path.parent.mkdir(parents=True, exist_ok=True)
+        entries = [
+            {'passage_id': passage_id, 'title': self._titles.get(passage_id), 'text': passage.text}
+            for passage_id, passage in self._passages.items()
+        ]
+        tmp_path = self.catalog_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entries, f, ensure_ascii=False)
+        tmp_path.replace(self.catalog_path)
+        self._loaded_mtime = self._file_mtime()
+
+    def register(self, text: str, title: str = None) -> CompiledPassage:
+        """
+        Register a passage (idempotent for the same text)
+
+        Args:
+            text: Reference text
+            title: Optional human-readable title
+
+        Returns:
+            CompiledPassage: The compiled passage
+
+        Raises:
+            ValueError: If the text or title is not a string, the text is empty
+                        or too long, or the catalog is full
+        """
+        if not isinstance(text, str):
+            raise ValueError('Passage text must be a string')
+        if title is not None and not isinstance(title, str):
+            raise ValueError('Passage title must be a string')
+        if not text.strip():
+            raise ValueError('Passage text is empty')
+        if len(text) > self.max_chars:
+            raise ValueError(f'Passage text is longer than {self.max_chars} characters')
+
+        passage_id = make_passage_id(text)
+        with self._lock, self._file_lock():
+            # Pick up passages other workers saved so this write does not drop them
+            self._refresh(force=True)
+            passage = self._passages.get(passage_id)
+            if passage is not None:
+                return passage
+            if len(self._passages) >= self.max_passages:
+                raise ValueError('Passage catalog is full')
+
+            passage = CompiledPassage(text, passage_id)
+            self._passages[passage_id] = passage
+            self._titles[passage_id] = title
+            self._save()
+
+        logger.info(f"Registered passage {passage_id} ({len(passage.tokens)} words)")
+        return passage
+
+    def get(self, passage_id: str):
+        """Get a compiled passage by id (None if not registered)"""
+        passage = self._passages.get(passage_id)
+        if passage is None and self.catalog_path:
+            # May have been registered by another worker
+            with self._lock:
+                self._refresh()
+                passage = self._passages.get(passage_id)
+        return passage
+
+    def describe(self, passage: CompiledPassage) -> dict:
+        """Public description of a registered passage"""
+        return dict(passage.to_dict(), title=self._titles.get(passage.passage_id))
+
+    def list_passages(self) -> list:
+        """List registered passages without their full text"""
+        with self._lock:
+            self._refresh()
+        return [
+            {key: value for key, value in self.describe(passage).items() if key != 'text'}
+            for passage in list(self._passages.values())
+        ]
+
+
+# Global catalog instance
+passage_catalog = PassageCatalog()
+
+
+def init_passage_catalog(app):
+    """
+    Configure the passage catalog and load persisted passages
+
+    Args:
+        app: Flask application instance
+    """
+    passage_catalog.catalog_path = (
+        Path(app.config['PASSAGE_CATALOG_PATH']) if app.config.get('PASSAGE_CATALOG_PATH') else None
+    )
+    passage_catalog.max_passages = app.config.get('PASSAGE_CATALOG_MAX_PASSAGES', 1000)
+    passage_catalog.max_chars = app.config.get('PASSAGE_MAX_CHARS', 5000)
+    passage_catalog.load()
@@ -0,0 +1,139 @@
+import copy
+import json
+import logging
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+_RESULT_ID_PATTERN = re.compile(r'^[0-9a-f]{16}$')
+
+
+class AnalysisResultStore:
+    """
+    Bounded store of recent analysis results, addressable by id.
+
+    With a result_dir every result is a JSON file in that directory, so all
+    worker processes on the host see each other's results. Without one,
+    results are kept in memory and only the saving worker can resolve them.
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl_seconds: int = 3600, result_dir: str = None):
+        """
+        Initialize result store
+
+        Args:
+            max_entries: Maximum number of results kept
+            ttl_seconds: How long a result can be referenced
+            result_dir: Directory shared by all workers (None = in-memory only)
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.result_dir = Path(result_dir) if result_dir else None
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+
+    def save(self, passage_key: str, result: dict) -> str:
+        """
+        Store a result for later retries
+
+        Args:
+            passage_key: Key of the passage the result belongs to
+            result: Analysis result
+
+        Returns:
+            str: Result id
+        """
+        result_id = uuid.uuid4().hex[:16]
+        if self.result_dir:
+            self._save_file(result_id, passage_key, result)
+            return result_id
+
+        with self._lock:
+            self._results[result_id] = (passage_key, copy.deepcopy(result), time.time())
+            while len(self._results) > self.max_entries:
+                self._results.popitem(last=False)
+        return result_id
+
+    def get(self, result_id: str):
+        """
+        Get a stored result
+
+        Returns:
+            tuple: (passage_key, copy of result) or None if unknown or expired
+        """
+        if self.result_dir:
+            return self._get_file(result_id)
+
+        with self._lock:
+            entry = self._results.get(result_id)
+        if entry is None:
+            return None
+        passage_key, result, created_at = entry
+        if created_at < time.time() - self.ttl_seconds:
+            return None
+        return passage_key, copy.deepcopy(result)
+
+    def _save_file(self, result_id: str, passage_key: str, result: dict):
+        self.result_dir.mkdir(parents=True, exist_ok=True)
+        path = self.result_dir / f"{result_id}.json"
+        tmp_path = path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'passage_key': passage_key, 'result': result}, f, ensure_ascii=False)
+        tmp_path.replace(path)
+        self._evict()
+
+    def _get_file(self, result_id: str):
+        if not _RESULT_ID_PATTERN.match(result_id or ''):
+            return None
+        path = self.result_dir / f"{result_id}.json"
+        try:
+            if path.stat().st_mtime < time.time() - self.ttl_seconds:
+                return None
+            with open(path, encoding='utf-8') as f:
+                entry = json.load(f)
+            return entry['passage_key'], entry['result']
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Failed to read stored result {result_id}: {str(e)}")
+            return None
+
+    def _evict(self):
+        """Drop expired results and the oldest ones beyond max_entries"""
+        entries = []
+        for path in self.result_dir.glob('*.json'):
+            try:
+                entries.append((path.stat().st_mtime, path))
+            except FileNotFoundError:
+                # Removed concurrently by another worker
+                continue
+
+        entries.sort()
+        expired_before = time.time() - self.ttl_seconds
+        excess = len(entries) - self.max_entries
+        for index, (mtime, path) in enumerate(entries):
+            if index >= excess and mtime >= expired_before:
+                break
+            path.unlink(missing_ok=True)
+
+
+# Global store instance
+result_store = AnalysisResultStore()
+
+
+def init_result_store(app):
+    """
+    Configure the result store from app config
+
+    Args:
+        app: Flask application instance
+    """
+    result_store.max_entries = app.config.get('RESULT_CACHE_MAX_ENTRIES', 1000)
+    result_store.ttl_seconds = app.config.get('RESULT_CACHE_TTL_SECONDS', 3600)
+    result_dir = app.config.get('RESULT_CACHE_DIR')
+    result_store.result_dir = Path(result_dir) if result_dir else None
@@ -0,0 +1,136 @@
+import numpy as np
+from app.utils.audio import SAMPLE_RATE
+
+# 25 ms frames with a 10 ms hop
+FRAME_SECONDS = 0.025
+HOP_SECONDS = 0.010
+# Voice activity: frames this far above the noise floor count as speech
+VAD_MARGIN_DB = 12.0
+# Frames below this level are never speech (dBFS)
+VAD_ABSOLUTE_FLOOR_DB = -55.0
+# Below this dynamic range pauses cannot be told apart from speech (continuous
+# speech, or speech buried in loud steady noise), so every audible frame counts
+VAD_MIN_DYNAMIC_RANGE_DB = 10.0
+# Gaps shorter than this inside speech are treated as articulation, not pauses
+MIN_PAUSE_SECONDS = 0.25
+# Speech bursts shorter than this are treated as noise
+MIN_SPEECH_SECONDS = 0.05
+# Recordings with less speech than this, and no frame louder than
+# SILENT_MAX_PEAK_DB, are considered empty
+SILENT_MAX_SPEECH_SECONDS = 0.3
+SILENT_MAX_PEAK_DB = -50.0
+
+
+def _frame_energy_db(samples: np.ndarray, sample_rate: int) -> np.ndarray:
+    """RMS energy per frame in dBFS"""
+    frame_size = int(FRAME_SECONDS * sample_rate)
+    hop_size = int(HOP_SECONDS * sample_rate)
+    if samples.size < frame_size:
+        return np.zeros(0, dtype=np.float32)
+    frames = np.lib.stride_tricks.sliding_window_view(samples, frame_size)[::hop_size]
+    rms = np.sqrt(np.einsum('ij,ij->i', frames, frames) / frame_size)
+    return 20 * np.log10(rms + 1e-10)
+
+
+def _runs(mask: np.ndarray):
+    """Start/end indices (end exclusive) of consecutive True runs"""
+    padded = np.concatenate(([False], mask, [False]))
+    changes = np.flatnonzero(padded[1:] != padded[:-1])
+    return changes[0::2], changes[1::2]
+
+
+def _fill_short_runs(mask: np.ndarray, value: bool, max_frames: int) -> np.ndarray:
+    """Flip interior runs of `value` shorter than max_frames"""
+    starts, ends = _runs(mask == value)
+    interior = (starts > 0) & (ends < mask.size)
+    short = interior & ((ends - starts) < max_frames)
+    mask = mask.copy()
+    for start, end in zip(starts[short], ends[short]):
+        mask[start:end] = not value
+    return mask
+
+
+def detect_speech(energy_db: np.ndarray) -> np.ndarray:
+    """
+    Energy-based voice activity detection
+
+    Args:
+        energy_db: Frame energies from _frame_energy_db
+
+    Returns:
+        np.ndarray: Boolean speech flag per frame
+    """
+    if energy_db.size == 0:
+        return np.zeros(0, dtype=bool)
+    noise_floor = np.percentile(energy_db, 10)
+    peak = energy_db.max()
+    if peak - noise_floor < VAD_MIN_DYNAMIC_RANGE_DB:
+        return energy_db > VAD_ABSOLUTE_FLOOR_DB
+    # Never below noise_floor + margin, or stationary noise would count as speech
+    threshold = max(noise_floor + VAD_MARGIN_DB, VAD_ABSOLUTE_FLOOR_DB)
+    speech = energy_db > threshold
+
+    min_speech_frames = max(int(MIN_SPEECH_SECONDS / HOP_SECONDS), 1)
+    # Drop isolated clicks, then bridge gaps too short to be pauses
+    speech = _fill_short_runs(speech, True, min_speech_frames)
+    speech = _fill_short_runs(speech, False, int(MIN_PAUSE_SECONDS / HOP_SECONDS))
+    return speech
+
+
+def extract_features(samples: np.ndarray, word_count: int = None,
+                     sample_rate: int = SAMPLE_RATE) -> dict:
+    """
+    Compute objective fluency features from decoded audio
+
+    Args:
+        samples: Mono PCM samples in [-1, 1]
+        word_count: Number of words in the reference text (enables rate features)
+        sample_rate: Sample rate of samples in Hz
+
+    Returns:
+        dict: Durations, pause statistics, speech/articulation rate and silence flag
+    """
+    samples = np.asarray(samples, dtype=np.float32)
+    duration = samples.size / sample_rate
+    energy_db = _frame_energy_db(samples, sample_rate)
+    speech = detect_speech(energy_db)
+
+    speech_seconds = float(speech.sum() * HOP_SECONDS)
+    pause_lengths = np.zeros(0)
+    if speech.any():
+        first, last = np.flatnonzero(speech)[[0, -1]]
+        starts, ends = _runs(~speech[first:last + 1])
+        pause_lengths = (ends - starts) * HOP_SECONDS
+
+    peak_db = float(energy_db.max()) if energy_db.size else None
+    # Only skip the LLM when the clip is also quiet; loud audio goes to the model
+    is_silent = speech_seconds < SILENT_MAX_SPEECH_SECONDS and (
+        peak_db is None or peak_db < SILENT_MAX_PEAK_DB
+    )
+    features = {
+        'duration_seconds': round(duration, 3),
+        'speech_seconds': round(speech_seconds, 3),
+        'silence_ratio': round(1 - speech_seconds / duration, 4) if duration else 1.0,
+        'pause_count': int(pause_lengths.size),
+        'mean_pause_seconds': round(float(pause_lengths.mean()), 3) if pause_lengths.size else 0.0,
+        'longest_pause_seconds': round(float(pause_lengths.max()), 3) if pause_lengths.size else 0.0,
+        'peak_level_db': round(peak_db, 1) if peak_db is not None else None,
+        'is_silent': bool(is_silent),
+    }
+
+    if word_count:
+        # Rates are meaningless without speech
+        features['speech_rate_wpm'] = round(word_count / duration * 60, 1) if not is_silent else 0.0
+        features['articulation_rate_wpm'] = (
+            round(word_count / speech_seconds * 60, 1) if speech_seconds and not is_silent else 0.0
+        )
+    return features
+
+
+def extract_features_batch(clips, word_counts=None, sample_rate: int = SAMPLE_RATE) -> list:
+    """Compute features for several clips (e.g. for benchmarking or offline scoring)"""
+    word_counts = word_counts or [None] * len(clips)
+    return [
+        extract_features(samples, word_count, sample_rate)
+        for samples, word_count in zip(clips, word_counts)
+    ]
@@ -0,0 +1,67 @@
+import logging
+import shutil
+import subprocess
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+
+
+class AudioDecodeError(Exception):
+    """Raised when uploaded audio cannot be decoded"""
+
+
+def decode_audio(audio_bytes: bytes, sample_rate: int = SAMPLE_RATE, timeout: int = 30) -> np.ndarray:
+    """
+    Decode uploaded audio (mp3/wav/webm) to mono float32 PCM using ffmpeg
+
+    Args:
+        audio_bytes: Raw uploaded file content
+        sample_rate: Output sample rate in Hz
+        timeout: Maximum decoding time in seconds
+
+    Returns:
+        np.ndarray: Mono samples in [-1, 1]
+
+    Raises:
+        AudioDecodeError: If ffmpeg is missing or decoding fails
+    """
+    ffmpeg = shutil.which('ffmpeg')
+    if not ffmpeg:
+        raise AudioDecodeError('ffmpeg is not installed')
+
+    try:
+        process = subprocess.run(
+            [
+                ffmpeg, '-hide_banner', '-loglevel', 'error',
+                '-i', 'pipe:0',
+                '-f', 'f32le', '-ac', '1', '-ar', str(sample_rate),
+                'pipe:1',
+            ],
+            input=audio_bytes,
+            capture_output=True,
+            timeout=timeout,
+            check=False,
+        )
+    except subprocess.TimeoutExpired:
+        raise AudioDecodeError('Audio decoding timed out')
+
+    if process.returncode != 0:
+        raise AudioDecodeError(process.stderr.decode('utf-8', 'replace').strip() or 'ffmpeg failed')
+
+    return np.frombuffer(process.stdout, dtype=np.float32)
+
+
+def try_decode_audio(audio_bytes: bytes, sample_rate: int = SAMPLE_RATE):
+    """
+    Decode audio for local analysis, returning None instead of raising
+
+    Local analysis is an optimization, so requests still go to the LLM
+    when the audio cannot be decoded here.
+    """
+    try:
+        return decode_audio(audio_bytes, sample_rate)
+    except AudioDecodeError as e:
+        logger.warning(f"Skipping local audio analysis: {str(e)}")
+        return None
@@ -0,0 +1,291 @@
+import json
+import logging
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+import numpy as np
+from app.utils.audio import SAMPLE_RATE
+
+# Framing: 256 ms windows with a 16 ms hop at 16 kHz; the heavy overlap
+# keeps fingerprints stable when re-encoding shifts audio by a few samples
+FRAME_SIZE = 4096
+HOP_SIZE = 256
+# Frames transformed per FFT batch, bounds memory on long recordings
+FRAMES_PER_BATCH = 256
+# 33 log-spaced bands over the speech range give 32 bits per frame
+BAND_EDGES_HZ = np.geomspace(250, 4000, 34)
+SILENCE_FRAME_SIZE = 320
+SILENCE_RATIO = 0.05
+MIN_FRAMES = 16
+# Re-encoded copies of a recording score about 0.75-1.0 (low-pass, 8 kHz
+# resampling, quantization, codec noise, shifts); other takes of the same
+# passage stay below 0.6 and unrelated audio near 0.5
+DEFAULT_SIMILARITY_THRESHOLD = 0.70
+
+
+def _band_matrix(sample_rate: int) -> np.ndarray:
+    """Matrix mapping FFT power bins to band energies (bins x bands)"""
+    bin_freqs = np.fft.rfftfreq(FRAME_SIZE, 1.0 / sample_rate)
+    lower, upper = BAND_EDGES_HZ[:-1], BAND_EDGES_HZ[1:]
+    return ((bin_freqs[:, None] >= lower) & (bin_freqs[:, None] < upper)).astype(np.float32)
+
+
+logger = logging.getLogger(__name__)
+
+_KEY_PART_PATTERN = re.compile(r'^[0-9A-Za-z_-]+$')
+
+_BAND_MATRICES = {SAMPLE_RATE: _band_matrix(SAMPLE_RATE)}
+_WINDOW = np.hanning(FRAME_SIZE).astype(np.float32)
+_BIT_WEIGHTS = (1 << np.arange(BAND_EDGES_HZ.size - 2, dtype=np.uint64))
+
+
+def trim_silence(samples: np.ndarray) -> np.ndarray:
+    """Strip leading/trailing silence so re-encodes with different padding line up"""
+    n_frames = samples.size // SILENCE_FRAME_SIZE
+    if n_frames == 0:
+        return samples
+    frames = samples[:n_frames * SILENCE_FRAME_SIZE].reshape(n_frames, SILENCE_FRAME_SIZE)
+    rms = np.sqrt(np.mean(frames ** 2, axis=1))
+    voiced = np.flatnonzero(rms > rms.max() * SILENCE_RATIO)
+    if voiced.size == 0:
+        return samples[:0]
+    return samples[voiced[0] * SILENCE_FRAME_SIZE:(voiced[-1] + 1) * SILENCE_FRAME_SIZE]
+
+
+def compute_fingerprint(samples: np.ndarray, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """
+    Compute a spectral fingerprint robust to re-encoding and gain changes
+
+    Each frame contributes 32 bits: the sign of the time derivative of
+    adjacent band energy differences (Haitsma-Kalker style).
+
+    Args:
+        samples: Mono PCM samples
+        sample_rate: Sample rate of samples in Hz
+
+    Returns:
+        np.ndarray: uint32 sub-fingerprint per frame (may be empty)
+    """
+    samples = trim_silence(np.asarray(samples, dtype=np.float32))
+    if samples.size < FRAME_SIZE + HOP_SIZE:
+        return np.zeros(0, dtype=np.uint32)
+
+    band_matrix = _BAND_MATRICES.get(sample_rate)
+    if band_matrix is None:
+        band_matrix = _BAND_MATRICES.setdefault(sample_rate, _band_matrix(sample_rate))
+
+    frames = np.lib.stride_tricks.sliding_window_view(samples, FRAME_SIZE)[::HOP_SIZE]
+    energy = np.empty((frames.shape[0], band_matrix.shape[1]), dtype=np.float32)
+    for start in range(0, frames.shape[0], FRAMES_PER_BATCH):
+        batch = frames[start:start + FRAMES_PER_BATCH] * _WINDOW
+        power = np.abs(np.fft.rfft(batch, axis=1)) ** 2
+        energy[start:start + FRAMES_PER_BATCH] = np.log(power @ band_matrix + 1e-10)
+
+    band_diff = energy[:, :-1] - energy[:, 1:]
+    bits = (band_diff[1:] - band_diff[:-1]) > 0
+    return (bits @ _BIT_WEIGHTS).astype(np.uint32)
+
+
+def fingerprint_similarity(a: np.ndarray, b: np.ndarray, max_offset: int = 8,
+                           min_overlap: float = 0.8) -> float:
+    """
+    Similarity (1 - bit error rate) of two fingerprints, searching small time offsets
+
+    Args:
+        a, b: Fingerprints from compute_fingerprint
+        max_offset: Maximum frame shift tried in each direction
+        min_overlap: Minimum overlap as a fraction of the longer fingerprint
+
+    Returns:
+        float: 1.0 for identical audio, ~0.5 for unrelated audio, 0.0 if not comparable
+    """
+    if a.size < MIN_FRAMES or b.size < MIN_FRAMES:
+        return 0.0
+    longest = max(a.size, b.size)
+    if min(a.size, b.size) < longest * min_overlap:
+        return 0.0
+
+    best = 0.0
+    for offset in range(-max_offset, max_offset + 1):
+        a_part = a[max(offset, 0):]
+        b_part = b[max(-offset, 0):]
+        overlap = min(a_part.size, b_part.size)
+        if overlap < longest * min_overlap:
+            continue
+        diff = np.bitwise_xor(a_part[:overlap], b_part[:overlap])
+        bit_errors = np.unpackbits(diff.view(np.uint8)).sum()
+        best = max(best, 1.0 - bit_errors / (overlap * 32))
+    return float(best)
+
+
+class FingerprintIndex:
+    """Bounded in-memory index of fingerprints and the analysis results they produced"""
+
+    def __init__(self, threshold: float = DEFAULT_SIMILARITY_THRESHOLD, max_entries: int = 2000,
+                 max_per_key: int = 32, ttl_seconds: int = 86400):
+        """
+        Initialize fingerprint index
+
+        Args:
+            threshold: Minimum similarity for two recordings to count as duplicates
+            max_entries: Maximum fingerprints kept across all keys
+            max_per_key: Maximum fingerprints kept per passage
+            ttl_seconds: How long a stored result can be reused
+        """
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.max_per_key = max_per_key
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def lookup(self, key, fingerprint: np.ndarray):
+        """
+        Find the most similar stored recording for key
+
+        Returns:
+            tuple: (result, similarity) or None if nothing is above threshold
+        """
+        if fingerprint.size < MIN_FRAMES:
+            return None
+
+        with self._lock:
+            candidates = list(self._entries.get(key, ()))
+        cutoff = time.time() - self.ttl_seconds
+
+        best = None
+        for stored, result, created_at in candidates:
+            if created_at < cutoff:
+                continue
+            similarity = fingerprint_similarity(fingerprint, stored)
+            if similarity >= self.threshold and (best is None or similarity > best[1]):
+                best = (result, similarity)
+        return best
+
+    def add(self, key, fingerprint: np.ndarray, result):
+        """Store a fingerprint with its analysis result"""
+        if fingerprint.size < MIN_FRAMES:
+            return
+
+        with self._lock:
+            entries = self._entries.setdefault(key, [])
+            self._entries.move_to_end(key)
+            entries.append((fingerprint, result, time.time()))
+            self._size += 1
+            if len(entries) > self.max_per_key:
+                entries.pop(0)
+                self._size -= 1
+
+            # Evict from the least recently written passages
+            while self._size > self.max_entries:
+                oldest_key, oldest_entries = next(iter(self._entries.items()))
+                oldest_entries.pop(0)
+                self._size -= 1
+                if not oldest_entries:
+                    del self._entries[oldest_key]
+
+    def __len__(self):
+        return self._size
+
+
+class FileFingerprintIndex:
+    """
+    Fingerprint index stored as files, shared by all worker processes on a host.
+
+    Each passage key gets its own directory holding one .npz file per
+    recording (fingerprint plus JSON result), named by creation time so
+    eviction needs no extra bookkeeping.
+    """
+
+    def __init__(self, index_dir: str, threshold: float = DEFAULT_SIMILARITY_THRESHOLD,
+                 max_entries: int = 2000, max_per_key: int = 32, ttl_seconds: int = 86400):
+        """
+        Initialize fingerprint index
+
+        Args:
+            index_dir: Directory shared by all workers
+            threshold: Minimum similarity for two recordings to count as duplicates
+            max_entries: Maximum fingerprints kept across all keys
+            max_per_key: Maximum fingerprints kept per passage
+            ttl_seconds: How long a stored result can be reused
+        """
+        self.index_dir = Path(index_dir)
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.max_per_key = max_per_key
+        self.ttl_seconds = ttl_seconds
+
+    def _key_dir(self, key):
+        """Directory for a (kind, passage_key) key (None if unsafe as a path)"""
+        parts = [str(part) for part in key]
+        if not all(_KEY_PART_PATTERN.match(part) for part in parts):
+            return None
+        return self.index_dir / '-'.join(parts)
+
+    @staticmethod
+    def _created_at(path: Path) -> float:
+        return int(path.name.split('-', 1)[0]) / 1e9
+
+    def lookup(self, key, fingerprint: np.ndarray):
+        """
+        Find the most similar stored recording for key
+
+        Returns:
+            tuple: (result, similarity) or None if nothing is above threshold
+        """
+        key_dir = self._key_dir(key)
+        if fingerprint.size < MIN_FRAMES or key_dir is None or not key_dir.is_dir():
+            return None
+        cutoff = time.time() - self.ttl_seconds
+
+        best = None
+        for path in key_dir.glob('*.npz'):
+            if self._created_at(path) < cutoff:
+                continue
+            try:
+                with np.load(path) as data:
+                    stored = data['fingerprint']
+                    similarity = fingerprint_similarity(fingerprint, stored)
+                    if similarity >= self.threshold and (best is None or similarity > best[1]):
+                        best = (json.loads(str(data['result'])), similarity)
+            except FileNotFoundError:
+                # Evicted by another worker
+                continue
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"Skipping unreadable fingerprint {path}: {str(e)}")
+        return best
+
+    def add(self, key, fingerprint: np.ndarray, result):
+        """Store a fingerprint with its analysis result"""
+        key_dir = self._key_dir(key)
+        if fingerprint.size < MIN_FRAMES or key_dir is None:
+            return
+
+        key_dir.mkdir(parents=True, exist_ok=True)
+        path = key_dir / f"{time.time_ns()}-{uuid.uuid4().hex[:8]}.npz"
+        tmp_path = path.with_suffix('.tmp')
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, fingerprint=fingerprint, result=np.array(json.dumps(result, ensure_ascii=False)))
+        tmp_path.replace(path)
+        self._evict(key_dir)
+
+    def _evict(self, key_dir: Path):
+        """Drop expired entries and the oldest ones beyond the per-key and global limits"""
+        cutoff = time.time() - self.ttl_seconds
+        stale = sorted(key_dir.glob('*.npz'))[:-self.max_per_key]
+
+        entries = sorted(self.index_dir.glob('*/*.npz'), key=lambda path: path.name)
+        stale.extend(path for path in entries if self._created_at(path) < cutoff)
+        excess = len(entries) - self.max_entries
+        if excess > 0:
+            stale.extend(entries[:excess])
+
+        for path in stale:
+            path.unlink(missing_ok=True)
+
+    def __len__(self):
+        return sum(1 for _ in self.index_dir.glob('*/*.npz'))
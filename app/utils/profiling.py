@@ -0,0 +1,332 @@
+import contextvars
+import cProfile
+import functools
+import hmac
+import io
+import json
+import logging
+import pstats
+import random
+import re
+import threading
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Profiler attached to the request currently being handled (None when not profiling)
+_active_profiler = contextvars.ContextVar('active_profiler', default=None)
+
+# cProfile and tracemalloc are process-wide, so only one request is profiled at a time
+_profiling_lock = threading.Lock()
+
+_PROFILE_ID_PATTERN = re.compile(r'^[0-9A-Za-z_-]+$')
+
+# Reading profiles sends the token too; profiling those reads would only fill the ring
+_UNPROFILED_ENDPOINTS = ('api.list_profiles', 'api.download_profile')
+
+
+class RequestProfiler:
+    """Captures a cProfile profile, tracemalloc diff and section timings for one request"""
+
+    def __init__(self, name: str, trace_memory: bool = True, top_n: int = 25):
+        """
+        Initialize request profiler
+
+        Args:
+            name: Label for the profiled unit (usually the endpoint name)
+            trace_memory: Whether to take tracemalloc snapshots
+            top_n: Number of entries kept in the summary tables
+        """
+        self.name = name
+        self.trace_memory = trace_memory
+        self.top_n = top_n
+        self.sections = []
+        self._profile = cProfile.Profile()
+        self._started_tracemalloc = False
+        self._snapshot_before = None
+        self._started_at = None
+        self._duration = None
+        self._memory_diff = []
+        self._peak_memory = None
+
+    def start(self):
+        """Start collecting profile data"""
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracemalloc = True
+            tracemalloc.reset_peak()
+            self._snapshot_before = tracemalloc.take_snapshot()
+        self._started_at = time.perf_counter()
+        self._profile.enable()
+
+    def stop(self):
+        """Stop collecting profile data"""
+        self._profile.disable()
+        self._duration = time.perf_counter() - self._started_at
+        if self.trace_memory and self._snapshot_before is not None:
+            snapshot_after = tracemalloc.take_snapshot()
+            _, self._peak_memory = tracemalloc.get_traced_memory()
+            stats = snapshot_after.compare_to(self._snapshot_before, 'lineno')
+            self._memory_diff = [
+                {
+                    'location': str(stat.traceback[0]),
+                    'size_diff_kb': round(stat.size_diff / 1024, 2),
+                    'count_diff': stat.count_diff,
+                }
+                for stat in stats[:self.top_n]
+            ]
+            if self._started_tracemalloc:
+                tracemalloc.stop()
+
+    def record_section(self, name: str, duration: float):
+        """Record the wall time spent in a named section"""
+        self.sections.append({'name': name, 'duration_ms': round(duration * 1000, 3)})
+
+    def dump_stats(self, path: Path):
+        """Write raw pstats data (loadable with pstats/snakeviz)"""
+        self._profile.dump_stats(str(path))
+
+    def summary(self) -> dict:
+        """
+        Build a JSON-serializable summary of the profile
+
+        Returns:
+            dict: Duration, section timings, hottest functions and memory growth
+        """
+        stream = io.StringIO()
+        stats = pstats.Stats(self._profile, stream=stream)
+        stats.sort_stats('cumulative').print_stats(self.top_n)
+
+        return {
+            'name': self.name,
+            'duration_ms': round((self._duration or 0) * 1000, 3),
+            'sections': self.sections,
+            'top_functions': stream.getvalue(),
+            'memory_diff': self._memory_diff,
+            'peak_memory_kb': round(self._peak_memory / 1024, 2) if self._peak_memory else None,
+        }
+
+
+class ProfileStore:
+    """Bounded on-disk ring of captured profiles"""
+
+    def __init__(self, profile_dir: str, max_profiles: int = 50):
+        """
+        Initialize profile store
+
+        Args:
+            profile_dir: Directory where profiles are written
+            max_profiles: Maximum number of profiles kept before the oldest are dropped
+        """
+        self.profile_dir = Path(profile_dir)
+        self.max_profiles = max_profiles
+        self._lock = threading.Lock()
+
+    def save(self, profiler: RequestProfiler) -> str:
+        """
+        Persist a finished profile and evict the oldest ones beyond the limit
+
+        Returns:
+            str: Id of the stored profile
+        """
+        now = datetime.now(timezone.utc)
+        profile_id = f"{now.strftime('%Y%m%dT%H%M%S%f')}-{uuid.uuid4().hex[:8]}"
+        summary = profiler.summary()
+        summary['id'] = profile_id
+        summary['created_at'] = now.isoformat()
+
+        with self._lock:
+            self.profile_dir.mkdir(parents=True, exist_ok=True)
+            profiler.dump_stats(self.profile_dir / f"{profile_id}.prof")
+            with open(self.profile_dir / f"{profile_id}.json", 'w') as f:
+                json.dump(summary, f)
+            self._evict()
+
+        logger.info(f"Saved profile {profile_id} for {profiler.name} ({summary['duration_ms']} ms)")
+        return profile_id
+
+    def _evict(self):
+        """Remove the oldest profiles beyond max_profiles"""
+        summaries = sorted(self.profile_dir.glob('*.json'))
+        for summary_path in summaries[:max(len(summaries) - self.max_profiles, 0)]:
+            for path in (summary_path, summary_path.with_suffix('.prof')):
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+
+    def list_profiles(self) -> list:
+        """
+        List stored profiles, newest first
+
+        Returns:
+            list: Short description of each stored profile
+        """
+        if not self.profile_dir.exists():
+            return []
+
+        profiles = []
+        for summary_path in sorted(self.profile_dir.glob('*.json'), reverse=True):
+            try:
+                with open(summary_path) as f:
+                    summary = json.load(f)
+            except (OSError, ValueError):
+                continue
+            profiles.append({
+                'id': summary['id'],
+                'name': summary['name'],
+                'created_at': summary['created_at'],
+                'duration_ms': summary['duration_ms'],
+                'peak_memory_kb': summary.get('peak_memory_kb'),
+            })
+        return profiles
+
+    def get_path(self, profile_id: str, fmt: str = 'summary'):
+        """
+        Resolve the file for a stored profile
+
+        Args:
+            profile_id: Id returned by save()
+            fmt: 'summary' for the JSON summary, 'pstats' for raw profile data
+
+        Returns:
+            Path or None if the profile does not exist
+        """
+        if not _PROFILE_ID_PATTERN.match(profile_id):
+            return None
+        suffix = '.prof' if fmt == 'pstats' else '.json'
+        path = self.profile_dir / f"{profile_id}{suffix}"
+        return path if path.is_file() else None
+
+
+def profile_section(name: str):
+    """
+    Decorator that records the wall time of a function in the active request profile.
+    Costs a single context variable lookup when no request is being profiled.
+    """
+    def decorator(f):
+        @functools.wraps(f)
+        def wrapper(*args, **kwargs):
+            profiler = _active_profiler.get()
+            if profiler is None:
+                return f(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return f(*args, **kwargs)
+            finally:
+                profiler.record_section(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def profiled_block(name: str):
+    """Context manager variant of profile_section for inline blocks"""
+    profiler = _active_profiler.get()
+    if profiler is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profiler.record_section(name, time.perf_counter() - start)
+
+
+def has_profiling_token(app, request) -> bool:
+    """
+    Check that the request carries PROFILING_TOKEN in the profiling header.
+    Always False when no token is configured.
+    """
+    token = app.config.get('PROFILING_TOKEN')
+    header_value = request.headers.get(app.config.get('PROFILING_HEADER', 'X-Profile'))
+    if not token or not header_value:
+        return False
+    return hmac.compare_digest(header_value.encode('utf-8'), token.encode('utf-8'))
+
+
+def _should_profile(app, request) -> bool:
+    """Decide whether the current request is profiled (header opt-in or sampling)"""
+    if request.endpoint in _UNPROFILED_ENDPOINTS:
+        return False
+    if has_profiling_token(app, request):
+        return True
+
+    sample_rate = app.config.get('PROFILING_SAMPLE_RATE', 0.0)
+    return sample_rate > 0 and random.random() < sample_rate
+
+
+def init_profiling(app):
+    """
+    Register request hooks for on-demand profiling.
+    Nothing is registered when profiling is disabled, so it has no runtime cost.
+
+    Args:
+        app: Flask application instance
+    """
+    if not app.config.get('PROFILING_ENABLED', False):
+        app.profile_store = None
+        return
+
+    from flask import g, request
+
+    app.profile_store = ProfileStore(
+        app.config.get('PROFILING_DIR', './profiles'),
+        app.config.get('PROFILING_MAX_PROFILES', 50),
+    )
+    trace_memory = app.config.get('PROFILING_TRACEMALLOC', True)
+
+    @app.before_request
+    def start_request_profile():
+        if not _should_profile(app, request):
+            return
+        if not _profiling_lock.acquire(blocking=False):
+            logger.info(f"Skipping profile for {request.path}: another request is being profiled")
+            return
+
+        profiler = RequestProfiler(request.endpoint or request.path, trace_memory=trace_memory)
+        g.profiler = profiler
+        g.profiler_token = _active_profiler.set(profiler)
+        profiler.start()
+
+    @app.after_request
+    def finish_request_profile(response):
+        profiler = g.pop('profiler', None)
+        if profiler is None:
+            return response
+
+        try:
+            profiler.stop()
+            _active_profiler.reset(g.pop('profiler_token'))
+            response.headers['X-Profile-Id'] = app.profile_store.save(profiler)
+        except Exception as e:
+            logger.error(f"Failed to save profile: {str(e)}")
+        finally:
+            _profiling_lock.release()
+        return response
+
+    @app.teardown_request
+    def abort_request_profile(exc):
+        # Only reached with a live profiler if after_request did not run
+        profiler = g.pop('profiler', None)
+        if profiler is None:
+            return
+        profiler.stop()
+        _active_profiler.reset(g.pop('profiler_token'))
+        _profiling_lock.release()
+
+    if not app.config.get('PROFILING_TOKEN'):
+        logger.warning(
+            "PROFILING_TOKEN is not set: header opt-in and the /profiles endpoints are disabled"
+        )
+    logger.info(
+        f"Request profiling enabled: "
+        f"sample_rate={app.config.get('PROFILING_SAMPLE_RATE', 0.0)}, "
+        f"dir={app.profile_store.profile_dir}"
+    )
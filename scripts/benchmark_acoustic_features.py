@@ -0,0 +1,60 @@
+"""
+Benchmark local acoustic feature extraction on batches of synthetic clips.
+
+Usage:
+    python scripts/benchmark_acoustic_features.py [--clips 200] [--seconds 20]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.acoustic_features import extract_features_batch  # noqa: E402
+from app.utils.audio import SAMPLE_RATE  # noqa: E402
+
+
+def synthetic_clip(rng, seconds: float) -> np.ndarray:
+    """Noise bursts separated by pauses, roughly shaped like read speech"""
+    samples = []
+    remaining = seconds
+    while remaining > 0:
+        burst = min(rng.uniform(0.3, 2.0), remaining)
+        pause = min(rng.uniform(0.05, 0.8), max(remaining - burst, 0))
+        samples.append(rng.standard_normal(int(burst * SAMPLE_RATE)) * rng.uniform(0.05, 0.3))
+        samples.append(rng.standard_normal(int(pause * SAMPLE_RATE)) * 0.001)
+        remaining -= burst + pause
+    return np.concatenate(samples).astype(np.float32)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--clips', type=int, default=200, help='Number of clips in the batch')
+    parser.add_argument('--seconds', type=float, default=20.0, help='Length of each clip')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    clips = [synthetic_clip(rng, args.seconds) for _ in range(args.clips)]
+    word_counts = [int(args.seconds * 2.5)] * args.clips
+
+    # Warm up numpy code paths before timing
+    extract_features_batch(clips[:2], word_counts[:2])
+
+    start = time.perf_counter()
+    extract_features_batch(clips, word_counts)
+    elapsed = time.perf_counter() - start
+
+    audio_seconds = args.clips * args.seconds
+    print(f"Clips:            {args.clips} x {args.seconds:.1f}s")
+    print(f"Total time:       {elapsed * 1000:.1f} ms")
+    print(f"Per clip:         {elapsed / args.clips * 1000:.2f} ms")
+    print(f"Throughput:       {args.clips / elapsed:.1f} clips/s")
+    print(f"Real-time factor: {audio_seconds / elapsed:.0f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -40,7 +40,8 @@ sudo apt-get install -y \
     build-essential \
     libssl-dev \
     libffi-dev \
-    python3-dev
+    python3-dev \
+    ffmpeg
 
 # Create application directory
 echo "Setting up application directory..."
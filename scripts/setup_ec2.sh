@@ -137,7 +137,7 @@ apt-get update
 apt-get upgrade -y
 
 # Install Python and dependencies
-apt-get install -y python3 python3-pip python3-venv nginx git
+apt-get install -y python3 python3-pip python3-venv nginx git ffmpeg
 
 # Install supervisor for process management
 apt-get install -y supervisor
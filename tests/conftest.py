@@ -0,0 +1,4 @@
+import os
+
+# Importing the app package builds the LLM client, which needs a key
+os.environ.setdefault('GOOGLE_API_KEY', 'test-key')
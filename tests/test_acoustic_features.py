@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+from app.utils.acoustic_features import extract_features
+from app.utils.audio import SAMPLE_RATE
+
+BURSTS = 4
+BURST_SECONDS = 1.2
+PAUSE_SECONDS = 1.0
+LEAD_IN_SECONDS = 0.5
+
+
+def _db_to_rms(level_db):
+    return 10 ** (level_db / 20)
+
+
+def _read_aloud(noise_db, speech_db, seed=0):
+    """Speech-like bursts separated by pauses, over steady background noise"""
+    rng = np.random.default_rng(seed)
+
+    def noise(seconds):
+        return rng.normal(0, _db_to_rms(noise_db), int(seconds * SAMPLE_RATE))
+
+    parts = [noise(LEAD_IN_SECONDS)]
+    for _ in range(BURSTS):
+        t = np.arange(int(BURST_SECONDS * SAMPLE_RATE)) / SAMPLE_RATE
+        envelope = 0.8 + 0.2 * np.sin(2 * np.pi * 4 * t)
+        speech = rng.normal(0, 1, t.size) * _db_to_rms(speech_db) * envelope
+        parts.append(noise(BURST_SECONDS) + speech)
+        parts.append(noise(PAUSE_SECONDS))
+    return np.concatenate(parts).astype(np.float32)
+
+
+@pytest.mark.parametrize('noise_db, speech_db', [(-40, -20), (-46, -20), (-45, -15), (-70, -20)])
+def test_pauses_detected_over_background_noise(noise_db, speech_db):
+    samples = _read_aloud(noise_db, speech_db)
+    features = extract_features(samples)
+
+    expected_silence = (LEAD_IN_SECONDS + BURSTS * PAUSE_SECONDS) / (samples.size / SAMPLE_RATE)
+    assert features['pause_count'] == BURSTS - 1
+    assert features['mean_pause_seconds'] == pytest.approx(PAUSE_SECONDS, abs=0.1)
+    assert features['silence_ratio'] == pytest.approx(expected_silence, abs=0.05)
+    assert not features['is_silent']
+
+
+def test_speech_rate_uses_word_count():
+    samples = _read_aloud(-46, -20)
+    features = extract_features(samples, word_count=20)
+
+    assert features['speech_rate_wpm'] == pytest.approx(20 / features['duration_seconds'] * 60, rel=0.01)
+    assert features['articulation_rate_wpm'] > features['speech_rate_wpm']
+
+
+def test_digital_silence_is_silent():
+    features = extract_features(np.zeros(3 * SAMPLE_RATE, dtype=np.float32), word_count=5)
+
+    assert features['is_silent']
+    assert features['speech_seconds'] == 0
+    assert features['speech_rate_wpm'] == 0.0
+
+
+def test_speech_in_loud_steady_noise_is_not_silent():
+    # Noise std 0.05 (-26 dBFS) leaves too little dynamic range to find pauses,
+    # but the clip must still reach the LLM
+    features = extract_features(_read_aloud(-26, -22), word_count=20)
+
+    assert not features['is_silent']
+    assert features['speech_rate_wpm'] > 0
+
+
+def test_continuous_speech_without_pauses_is_not_silent():
+    rng = np.random.default_rng(2)
+    t = np.arange(4 * SAMPLE_RATE) / SAMPLE_RATE
+    envelope = 0.3 + 0.7 * np.abs(np.sin(2 * np.pi * 3 * t))
+    samples = (rng.normal(0, 0.1, t.size) * envelope).astype(np.float32)
+    features = extract_features(samples)
+
+    assert not features['is_silent']
+    assert features['speech_seconds'] == pytest.approx(4.0, abs=0.1)
+
+
+def test_quiet_room_noise_is_silent():
+    rng = np.random.default_rng(3)
+    samples = rng.normal(0, _db_to_rms(-60), 3 * SAMPLE_RATE).astype(np.float32)
+
+    assert extract_features(samples)['is_silent']
+
+
+def test_short_loud_click_is_not_silent():
+    samples = np.zeros(3 * SAMPLE_RATE, dtype=np.float32)
+    samples[SAMPLE_RATE:SAMPLE_RATE + 160] = 0.5
+    features = extract_features(samples, word_count=5)
+
+    assert not features['is_silent']
+    assert features['articulation_rate_wpm'] == 0.0
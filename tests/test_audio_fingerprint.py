@@ -0,0 +1,128 @@
+import numpy as np
+import pytest
+from app.utils.audio import SAMPLE_RATE
+from app.utils.audio_fingerprint import (
+    DEFAULT_SIMILARITY_THRESHOLD,
+    FileFingerprintIndex,
+    FingerprintIndex,
+    compute_fingerprint,
+    fingerprint_similarity,
+)
+
+
+def _read_aloud(seed, seconds=6.0, tempo=1.0, pitch=1.0):
+    """Voiced syllables with formants and short pauses over a -55 dBFS room noise floor"""
+    rng = np.random.default_rng(seed)
+    parts = []
+    total = 0
+    while total < seconds * SAMPLE_RATE:
+        duration = rng.uniform(0.12, 0.3) * tempo
+        t = np.arange(int(duration * SAMPLE_RATE)) / SAMPLE_RATE
+        f0 = pitch * rng.uniform(100, 180) * (1 + 0.1 * np.sin(2 * np.pi * t / duration))
+        phase = 2 * np.pi * np.cumsum(f0) / SAMPLE_RATE
+        formants = rng.uniform([300, 900, 2200], [800, 2200, 3200])
+        syllable = np.zeros(t.size)
+        for harmonic in range(1, 30):
+            frequency = harmonic * f0.mean()
+            amplitude = sum(np.exp(-((frequency - f) / 150) ** 2) for f in formants) + 0.02
+            syllable += amplitude / harmonic ** 0.5 * np.sin(harmonic * phase)
+        parts.append(syllable * np.hanning(t.size))
+        if rng.random() < 0.3:
+            parts.append(np.zeros(int(rng.uniform(0.05, 0.25) * SAMPLE_RATE)))
+        total += t.size
+    samples = np.concatenate(parts)
+    samples = 0.3 * samples / np.abs(samples).max()
+    return samples + np.random.default_rng(seed + 1000).normal(0, 10 ** (-55 / 20), samples.size)
+
+
+def _low_pass(samples, cutoff_hz):
+    spectrum = np.fft.rfft(samples)
+    spectrum[np.fft.rfftfreq(samples.size, 1 / SAMPLE_RATE) > cutoff_hz] = 0
+    return np.fft.irfft(spectrum, samples.size)
+
+
+def _add_noise(samples, level_db, seed=7):
+    return samples + np.random.default_rng(seed).normal(0, 10 ** (level_db / 20), samples.size)
+
+
+def _delay(samples, count):
+    return np.concatenate([np.zeros(count), samples])
+
+
+def _quantize(samples, bits):
+    steps = 2 ** (bits - 1)
+    return np.round(samples * steps) / steps
+
+
+# Stand-ins for what browser re-encoding (opus/webm, low-bitrate mp3) does to a recording
+DEGRADATIONS = {
+    'mild': lambda x: _add_noise(_delay(0.7 * np.convolve(x, [0.25, 0.5, 0.25], mode='same'), 137), -50),
+    'narrowband': lambda x: _low_pass(x, 3400),
+    'resampled_8k': lambda x: np.interp(
+        np.arange(x.size) / 2, np.arange(x.size // 2), _low_pass(x, 3900)[::2][:x.size // 2]
+    ),
+    '8_bit': lambda x: _quantize(x, 8),
+    'codec_noise': lambda x: _add_noise(x, -40),
+    'combined': lambda x: _add_noise(_quantize(_delay(_low_pass(0.5 * x, 3400), 611), 10), -45),
+}
+
+
+def _similarity(a, b):
+    return fingerprint_similarity(
+        compute_fingerprint(np.asarray(a, dtype=np.float32)),
+        compute_fingerprint(np.asarray(b, dtype=np.float32)),
+    )
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+@pytest.mark.parametrize('degradation', sorted(DEGRADATIONS))
+def test_reencoded_recording_is_a_duplicate(seed, degradation):
+    samples = _read_aloud(seed)
+
+    assert _similarity(samples, DEGRADATIONS[degradation](samples)) >= DEFAULT_SIMILARITY_THRESHOLD
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_different_take_is_not_a_duplicate(seed):
+    samples = _read_aloud(seed)
+    # Same syllables read slightly slower and higher, and a different reading
+    retake = _read_aloud(seed, tempo=1.05, pitch=1.03)
+    other = _read_aloud(seed + 100)
+
+    assert _similarity(samples, retake) < DEFAULT_SIMILARITY_THRESHOLD
+    assert _similarity(samples, other) < DEFAULT_SIMILARITY_THRESHOLD
+
+
+def test_index_returns_result_for_reencoded_upload_only():
+    samples = _read_aloud(0)
+    index = FingerprintIndex()
+    index.add(('errors', 'passage'), compute_fingerprint(samples.astype(np.float32)), {'errors': []})
+
+    reencoded = DEGRADATIONS['combined'](samples).astype(np.float32)
+    match = index.lookup(('errors', 'passage'), compute_fingerprint(reencoded))
+    assert match is not None and match[0] == {'errors': []}
+
+    retake = _read_aloud(0, tempo=1.05, pitch=1.03).astype(np.float32)
+    assert index.lookup(('errors', 'passage'), compute_fingerprint(retake)) is None
+    assert index.lookup(('errors', 'other'), compute_fingerprint(reencoded)) is None
+
+
+def test_file_index_is_shared_and_bounded(tmp_path):
+    samples = _read_aloud(0).astype(np.float32)
+    fingerprint = compute_fingerprint(samples)
+    writer = FileFingerprintIndex(tmp_path, max_entries=3, max_per_key=2)
+    # A second instance stands in for another worker process
+    reader = FileFingerprintIndex(tmp_path, max_entries=3, max_per_key=2)
+
+    writer.add(('errors', 'p1'), fingerprint, {'errors': [{'position': 1}]})
+    match = reader.lookup(('errors', 'p1'), compute_fingerprint(DEGRADATIONS['mild'](samples).astype(np.float32)))
+    assert match is not None and match[0] == {'errors': [{'position': 1}]}
+    assert reader.lookup(('measures', 'p1'), fingerprint) is None
+
+    for passage_key in ('p1', 'p1', 'p2', 'p2'):
+        writer.add(('errors', passage_key), fingerprint, {'errors': []})
+    assert len(reader) == 3
+    assert len(list((tmp_path / 'errors-p1').glob('*.npz'))) == 1
+
+    writer.add(('errors', '../x'), fingerprint, {'errors': []})
+    assert len(reader) == 3
@@ -0,0 +1,28 @@
+from app.AI_module.passages import CompiledPassage, make_passage_id
+
+
+def test_render_without_errors_returns_skeleton():
+    passage = CompiledPassage('I have a dog.')
+
+    assert passage.render_html([]) is passage.html_skeleton
+    assert passage.html_skeleton == "<span style='color: green'>I have a dog.</span>"
+
+
+def test_render_highlights_errors_in_skeleton():
+    passage = CompiledPassage('  I  have\na dog,  great! ')
+    errors = [{'position': 4}, {'position': 0}, {'position': 99}, {'position': 'x'}]
+
+    assert passage.render_html(errors) == (
+        "<span style='color: green'><span style='color:red'>I</span> have a dog, "
+        "<span style='color:red'>great!</span></span>"
+    )
+
+
+def test_retry_positions_include_neighbours():
+    passage = CompiledPassage('one two three four five six')
+
+    assert passage.retry_positions([{'position': 0}, {'position': 3}], window=1) == [0, 1, 2, 3, 4]
+
+
+def test_passage_id_ignores_whitespace():
+    assert make_passage_id('I have  a\ndog') == make_passage_id('I have a dog')
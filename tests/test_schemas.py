@@ -0,0 +1,192 @@
+import json
+import pytest
+from app.AI_module import llm as llm_module
+from app.AI_module.schemas import (
+    MAX_BAND_SCORE,
+    REPAIR_NONE,
+    REPAIR_SYNTAX,
+    REPAIR_TRUNCATED,
+    OutputValidationError,
+    coerce_errors,
+    coerce_measures,
+    repair_json,
+)
+
+TOKENS = 'I have a dog and a cat.'.split()
+
+
+class FakeMessage:
+    def __init__(self, content):
+        self.content = content
+
+
+class FakeLLM:
+    """Returns canned outputs in order and counts calls"""
+
+    def __init__(self, *outputs):
+        self.outputs = list(outputs)
+        self.calls = 0
+
+    def invoke(self, messages):
+        self.calls += 1
+        return FakeMessage(self.outputs.pop(0))
+
+
+def _validate_errors(data):
+    return coerce_errors(data, TOKENS)
+
+
+# repair_json
+
+@pytest.mark.parametrize('text', [
+    '```json\n{"errors": []}\n```',
+    '```\n{"errors": []}\n```',
+    'Here is the analysis:\n{"errors": []}\nLet me know if you need more.',
+])
+def test_wrapped_json_is_not_a_repair(text):
+    assert repair_json(text) == ({'errors': []}, REPAIR_NONE)
+
+
+def test_trailing_commas_are_removed_outside_strings():
+    data, repair = repair_json('{"errors": [{"word": "dog", "explanation": "x, ]",},]}')
+
+    assert repair == REPAIR_SYNTAX
+    assert data == {'errors': [{'word': 'dog', 'explanation': 'x, ]'}]}
+
+
+def test_truncated_mid_string():
+    data, repair = repair_json('{"errors": [{"word": "dog", "explanation": "should be /d')
+
+    assert repair == REPAIR_TRUNCATED
+    assert data == {'errors': [{'word': 'dog', 'explanation': 'should be /d'}]}
+
+
+def test_truncated_mid_key_drops_the_unfinished_pair():
+    data, repair = repair_json('{"errors": [{"word": "dog", "posi')
+
+    assert repair == REPAIR_TRUNCATED
+    assert data == {'errors': [{'word': 'dog'}]}
+
+
+def test_truncated_mid_array():
+    data, repair = repair_json('{"errors": [{"word": "dog", "position": 3}, {"word": "ca')
+
+    assert repair == REPAIR_TRUNCATED
+    assert data['errors'][0] == {'word': 'dog', 'position': 3}
+
+
+def test_truncated_after_separator():
+    assert repair_json('{"errors": [1, 2,') == ({'errors': [1, 2]}, REPAIR_TRUNCATED)
+
+
+def test_malformed_complete_output_is_not_trimmed():
+    errors = [{'word': f'w{i}', 'position': i} for i in range(400)]
+    text = json.dumps({'errors': errors}).replace('"w1"', '"w1" oops', 1)
+
+    with pytest.raises(OutputValidationError):
+        repair_json(text)
+
+
+def test_truncated_output_is_not_trimmed_to_a_fraction():
+    errors = [{'word': f'w{i}', 'position': i} for i in range(400)]
+    text = json.dumps({'errors': errors}).replace('"w1"', '"w1" oops', 1)[:-40]
+
+    with pytest.raises(OutputValidationError):
+        repair_json(text)
+
+
+def test_no_json_object():
+    with pytest.raises(OutputValidationError):
+        repair_json('I could not analyse this recording.')
+
+
+# coerce_errors
+
+def test_position_realigned_to_reported_word():
+    errors = coerce_errors({'errors': [{'word': 'cat.', 'position': 2}]}, TOKENS)
+
+    assert [error['position'] for error in errors] == [6]
+
+
+def test_repeated_word_uses_nearest_unused_position():
+    errors = coerce_errors({'errors': [
+        {'word': 'a', 'position': 4},
+        {'word': 'a', 'position': 4},
+    ]}, TOKENS)
+
+    assert [error['position'] for error in errors] == [2, 5]
+
+
+def test_out_of_range_position_clamped_only_without_word():
+    errors = coerce_errors({'errors': [
+        {'word': '', 'position': 99},
+        {'word': 'zebra', 'position': 99},
+    ]}, TOKENS)
+
+    assert [error['position'] for error in errors] == [len(TOKENS) - 1]
+
+
+@pytest.mark.parametrize('position', ['NaN', 'Infinity', '-Infinity', '1e400'])
+def test_non_finite_position_is_ignored(position):
+    data = json.loads('{"errors": [{"word": "dog", "position": %s}]}' % position)
+
+    assert [error['position'] for error in coerce_errors(data, TOKENS)] == [3]
+
+
+@pytest.mark.parametrize('data', [{'result': []}, [], {'errors': None}])
+def test_missing_error_list_is_rejected(data):
+    with pytest.raises(OutputValidationError):
+        coerce_errors(data, TOKENS)
+
+
+# coerce_measures
+
+def _measures(fluency_score):
+    return json.loads(
+        '{"fluency_and_coherence": {"score": %s, "feedback": "ok"},'
+        ' "lexical_resource": 7, "grammatical_range_and_accuracy": "6.5 band",'
+        ' "pronunciation": {"score": 12}}' % fluency_score
+    )
+
+
+def test_scores_are_coerced_and_clamped():
+    measures = coerce_measures(_measures('5'))
+
+    assert measures['fluency_and_coherence'] == {'score': 5, 'feedback': 'ok'}
+    assert measures['grammatical_range_and_accuracy']['score'] == 6.5
+    assert measures['pronunciation']['score'] == MAX_BAND_SCORE
+
+
+@pytest.mark.parametrize('score', ['NaN', 'Infinity', '-Infinity', '1e400'])
+def test_non_finite_score_is_rejected(score):
+    with pytest.raises(OutputValidationError):
+        coerce_measures(_measures(score))
+
+
+# invoke_structured
+
+def test_fenced_empty_result_is_accepted_without_recall(monkeypatch):
+    fake = FakeLLM('```json\n{"errors": []}\n```')
+    monkeypatch.setattr(llm_module, 'llm', fake)
+
+    assert llm_module.invoke_structured([], _validate_errors, max_recalls=2) == []
+    assert fake.calls == 1
+
+
+def test_empty_after_truncation_triggers_recall(monkeypatch):
+    fake = FakeLLM('{"errors": [', '{"errors": [{"word": "dog", "position": 3}]}')
+    monkeypatch.setattr(llm_module, 'llm', fake)
+
+    errors = llm_module.invoke_structured([], _validate_errors, max_recalls=2)
+
+    assert [error['position'] for error in errors] == [3]
+    assert fake.calls == 2
+
+
+def test_unrecoverable_output_fails_after_recalls(monkeypatch):
+    fake = FakeLLM('{"result": []}', 'no json here')
+    monkeypatch.setattr(llm_module, 'llm', fake)
+
+    with pytest.raises(OutputValidationError):
+        llm_module.invoke_structured([], _validate_errors, max_recalls=1)
+    assert fake.calls == 2